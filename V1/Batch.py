@@ -0,0 +1,76 @@
+import argparse
+import json
+import sys
+from Libraries import *
+
+
+def readLines(paths):
+    if not paths:
+        paths = ["-"]
+    for path in paths:
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        try:
+            for line in f:
+                line = line.rstrip("\n")
+                if line.strip() != "":
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def chunks(lines, size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def processChunk(n, lines):
+    prepared = [n.tokenizeCommand(line) for line in lines]
+    toTag = [p[1] for p in prepared if p[1] is not None]
+    tagged = iter(tagSents(toTag))
+    results = []
+    for (line, p) in zip(lines, prepared):
+        lineTagged = None if p[1] is None else next(tagged)
+        try:
+            parsed = n.parseCommand(line, tagged=lineTagged, prepared=p)
+            result = {"input": line, "reply": n.planReply(parsed)}
+        except Exception as e:
+            #One bad line shouldn't stop a replay of thousands
+            results.append({"input": line, "error": "%s: %s" % (type(e).__name__, e)})
+            continue
+        if parsed["quit"]:
+            result.update({"kind": "quit", "template": None, "slots": None})
+        elif parsed["statement"] is not None:
+            result.update({"kind": "statement", "template": parsed["statementTemplate"], "slots": parsed["statement"]})
+        elif parsed["question"] is not None:
+            result.update({"kind": "question", "template": parsed["questionTemplate"], "slots": parsed["question"]})
+        else:
+            result.update({"kind": None, "template": None, "slots": None})
+        if not parsed["quit"]:
+            result["tokens"] = parsed["tokens"]
+            result["negative"] = parsed["negative"]
+        results.append(result)
+    return results
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Parse utterances offline and write one JSON result per line")
+    parser.add_argument("files", nargs="*", help="files of utterances, one per line (default or - reads stdin)")
+    parser.add_argument("-o", "--output", help="write results here instead of stdout")
+    parser.add_argument("--chunk", type=int, default=1000, help="utterances tagged per pos_tag_sents call")
+    args = parser.parse_args()
+    n = nlpTranslator(voice=False)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in chunks(readLines(args.files), args.chunk):
+            for result in processChunk(n, chunk):
+                out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
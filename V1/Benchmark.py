@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from Libraries import *
+from Extract import extractHTML
+
+benchDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+#The steps of parseCommand, one at a time so each can be timed.
+#Each stage takes the translator and the running state dict.
+def tokenizeStage(n, st):
+    (st["cleaned"], st["tokens"], st["negative"]) = n.tokenizeCommand(st["raw"])
+
+def tagStage(n, st):
+    st["tagged"] = tag(st["tokens"])
+
+def tagUncachedStage(n, st):
+    lazyImport("nltk").pos_tag(st["tokens"])
+
+def classifyStage(n, st):
+    (st["types"], st["negatives"]) = n.classify(st["tagged"])
+
+def normalizeSentenceStage(n, st):
+    (st["tagged"], st["types"]) = n.normalizeSentence(st["tagged"], st["types"])
+
+def formatSentenceStage(n, st):
+    st["statement"] = n.formatSentence(st["tagged"], st["types"], n.statementIndex)
+    st["question"] = n.formatSentence(st["tagged"], st["types"], n.questionIndex)
+
+pipelineStages = [("tokenize", tokenizeStage), ("tag", tagStage), ("tag (uncached)", tagUncachedStage),
+                  ("classify", classifyStage), ("normalizeSentence", normalizeSentenceStage),
+                  ("formatSentence", formatSentenceStage)]
+
+
+def chainedNormalize(n, tagged, types):
+    #What normalizeSentence replaced: the original chain of normalizeAllVerbs,
+    #mergeNouns, removeIrrelevant and mergeHowMany
+    chained = n.normalizeAllVerbs(tagged, types)
+    (chained, chainedTypes) = n.mergeNouns(chained, types)
+    (chained, chainedTypes) = n.removeIrrelevant(chained, chainedTypes)
+    return n.mergeHowMany(chained, chainedTypes)
+
+
+def verifyGolden(n, corpus):
+    #The fused normalizeSentence must give the same result as the original chain
+    mismatches = 0
+    for line in corpus:
+        tokens = n.tokenizeCommand(line)[1]
+        if tokens is None:
+            continue
+        tagged = tag(tokens)
+        types = n.makeTypes(tagged)
+        expected = chainedNormalize(n, tagged, types)
+        actual = n.normalizeSentence(tagged, types)
+        if expected != actual:
+            mismatches += 1
+            print("mismatch for %r:\n  chained %r\n  fused   %r" % (line, expected, actual))
+    print("%d of %d utterances normalized differently" % (mismatches, len(corpus)))
+    return mismatches
+
+
+def timeCall(call, args, samples, allocations):
+    if allocations is not None:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        call(*args)
+        allocations.append(tracemalloc.get_traced_memory()[1] - before)
+        return
+    start = time.perf_counter()
+    call(*args)
+    samples.append(time.perf_counter() - start)
+
+
+def recordFailure(failures, line, stage, e):
+    #A line that breaks is reported at the end instead of stopping the run
+    key = (line, stage)
+    if key not in failures:
+        failures[key] = "%s: %s" % (type(e).__name__, e)
+
+
+def runPipeline(n, corpus, repeat, samples, allocations, failures):
+    for _ in range(repeat):
+        for line in corpus:
+            st = {"raw": line}
+            for (name, stage) in pipelineStages:
+                if name != "tokenize" and st["tokens"] is None:
+                    break
+                try:
+                    timeCall(stage, (n, st), samples.setdefault(name, []), None if allocations is None else allocations.setdefault(name, []))
+                except Exception as e:
+                    recordFailure(failures, line, name, e)
+                    break
+
+
+def startFixtureServer():
+    #Serves benchmarks/fixtures as /wiki/<name>, so fetches go over a real
+    #socket without touching the network. Unknown titles get the missing page.
+    fixtures = os.path.join(benchDir, "fixtures")
+    class handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            name = path.split("/")[-1].lower() + ".html"
+            if not os.path.exists(os.path.join(fixtures, name)):
+                name = "missing.html"
+            return os.path.join(fixtures, name)
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def runWiki(repeat, samples, allocations):
+    server = startFixtureServer()
+    fixtures = os.path.join(benchDir, "fixtures")
+    pages = {}
+    for name in sorted(os.listdir(fixtures)):
+        with open(os.path.join(fixtures, name), encoding="utf-8") as f:
+            pages[name[:-5]] = f.read()
+    #memorySize=0 and no file means every fetch really downloads and parses
+    uncached = wikiFacts(cache=pageCache(None, memorySize=0))
+    uncached.baseURL = "http://127.0.0.1:%d/wiki/" % server.server_address[1]
+    cached = wikiFacts(cache=pageCache(None))
+    cached.baseURL = uncached.baseURL
+    for name in pages:
+        cached.loadPage(name)
+    stages = [("wikiFacts parse", lambda name: extractHTML(pages[name])),
+              ("wikiFacts fetch", uncached.loadPage),
+              ("wikiFacts cached", cached.loadPage)]
+    try:
+        for _ in range(repeat):
+            for name in pages:
+                for (stage, call) in stages:
+                    timeCall(call, (name,), samples.setdefault(stage, []), None if allocations is None else allocations.setdefault(stage, []))
+    finally:
+        server.shutdown()
+
+
+def percentile(sortedSamples, p):
+    return sortedSamples[min(len(sortedSamples) - 1, int(round(p / 100.0 * (len(sortedSamples) - 1))))]
+
+
+def summarise(samples, allocations):
+    stages = {}
+    for (name, values) in samples.items():
+        values = sorted(values)
+        stages[name] = {
+            "calls": len(values),
+            "mean_us": statistics.mean(values) * 1e6,
+            "p50_us": percentile(values, 50) * 1e6,
+            "p90_us": percentile(values, 90) * 1e6,
+            "p99_us": percentile(values, 99) * 1e6,
+            "max_us": values[-1] * 1e6,
+            "alloc_peak_bytes": statistics.mean(allocations[name]) if allocations.get(name) else None,
+        }
+    return stages
+
+
+def throughput(n, corpus, repeat, failures):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for line in corpus:
+            try:
+                n.planReply(n.parseCommand(line))
+            except Exception as e:
+                recordFailure(failures, line, "planReply", e)
+    elapsed = time.perf_counter() - start
+    return len(corpus) * repeat / elapsed
+
+
+def compare(current, baselinePath, threshold):
+    with open(baselinePath) as f:
+        baseline = json.load(f)
+    regressions = []
+    print("\n%-22s %12s %12s %8s" % ("stage (p50)", "baseline us", "current us", "ratio"))
+    for (name, stats) in current["stages"].items():
+        old = baseline["stages"].get(name)
+        if old is None:
+            continue
+        ratio = stats["p50_us"] / old["p50_us"] if old["p50_us"] else float("inf")
+        flag = " <--" if ratio > threshold else ""
+        if flag:
+            regressions.append(name)
+        print("%-22s %12.1f %12.1f %7.2fx%s" % (name, old["p50_us"], stats["p50_us"], ratio, flag))
+    ratio = baseline["throughput_per_s"] / current["throughput_per_s"]
+    print("%-22s %12.0f %12.0f %7.2fx" % ("throughput /s", baseline["throughput_per_s"], current["throughput_per_s"], 1 / ratio))
+    if ratio > threshold:
+        regressions.append("throughput")
+    return regressions
+
+
+def report(result):
+    print("%-22s %7s %10s %10s %10s %10s %12s" % ("stage", "calls", "p50 us", "p90 us", "p99 us", "mean us", "alloc bytes"))
+    for (name, stats) in result["stages"].items():
+        alloc = "%12.0f" % stats["alloc_peak_bytes"] if stats["alloc_peak_bytes"] is not None else "%12s" % "-"
+        print("%-22s %7d %10.1f %10.1f %10.1f %10.1f %s" % (name, stats["calls"], stats["p50_us"], stats["p90_us"], stats["p99_us"], stats["mean_us"], alloc))
+    print("end to end: %.0f utterances/s" % result["throughput_per_s"])
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Time each stage of proscessCommand against a canned corpus and saved pages")
+    parser.add_argument("--corpus", default=os.path.join(benchDir, "corpus.txt"))
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results as JSON, e.g. to use as a baseline later")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    parser.add_argument("--verify", action="store_true", help="only check the fused normalizer against the original passes")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the (slow) tracemalloc pass")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [line.strip() for line in f if line.strip()]
+    n = nlpTranslator(voice=False)
+    if args.verify:
+        sys.exit(1 if verifyGolden(n, corpus) else 0)
+    #Warm up so lazy loading doesn't land in the first sample
+    failures = {}
+    runPipeline(n, corpus, 1, {}, None, failures)
+
+    samples = {}
+    runPipeline(n, corpus, args.repeat, samples, None, failures)
+    runWiki(max(1, args.repeat // 4), samples, None)
+    allocations = {}
+    if not args.no_alloc:
+        tracemalloc.start()
+        runPipeline(n, corpus, 1, {}, allocations, failures)
+        runWiki(1, {}, allocations)
+        tracemalloc.stop()
+
+    result = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": os.path.basename(args.corpus),
+        "utterances": len(corpus),
+        "repeat": args.repeat,
+        "stages": summarise(samples, allocations),
+        "throughput_per_s": throughput(n, corpus, args.repeat, failures),
+    }
+    result["errors"] = [{"input": line, "stage": stage, "error": error} for ((line, stage), error) in failures.items()]
+    report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    failed = False
+    if args.compare:
+        regressions = compare(result, args.compare, args.threshold)
+        if regressions:
+            print("\nregressed: " + ", ".join(regressions))
+            failed = True
+    if failures:
+        print("\n%d utterance(s) failed:" % len(failures))
+        for error in result["errors"]:
+            print("  %r in %s: %s" % (error["input"], error["stage"], error["error"]))
+        failed = True
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalizeTitle(name):
+    return "_".join(name.lower().split())
+
+
+class pageCache:
+    #Two tiers: an in-memory LRU in front of an sqlite file on disk.
+    #Entries are the extracted (title, summary, exists) triple, not raw HTML.
+    def __init__(self, path="pagecache.db", memorySize=256, diskSize=10000, ttl=7*24*60*60):
+        self.path = path
+        self.memorySize = memorySize
+        self.diskSize = diskSize
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memoryHits": 0, "diskHits": 0, "staleHits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                title TEXT,
+                summary TEXT,
+                exists_ INTEGER,
+                stored REAL,
+                accessed REAL)""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS pagesAccessed ON pages (accessed)")
+            self.db.commit()
+
+    def isFresh(self, stored):
+        return self.ttl is None or time.time() - stored < self.ttl
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memorySize:
+            self.memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get(self, name, allowStale=False):
+        #allowStale is for a second look after the first one missed and the
+        #fetch that followed failed, so an expired entry is better than
+        #nothing. That lookup is counted once: as a stale hit if this finds
+        #something, as the miss already recorded if not.
+        key = normalizeTitle(name)
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and (allowStale or self.isFresh(entry["stored"])):
+                self.memory.move_to_end(key)
+                self.countHit("memoryHits", entry["stored"], allowStale)
+                return entry
+            if self.db is not None:
+                row = self.db.execute("SELECT title, summary, exists_, stored FROM pages WHERE key = ?", (key,)).fetchone()
+                if row is not None and (allowStale or self.isFresh(row[3])):
+                    entry = {"title": row[0], "summary": row[1], "exists": bool(row[2]), "stored": row[3]}
+                    self.db.execute("UPDATE pages SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self.db.commit()
+                    self.remember(key, entry)
+                    self.countHit("diskHits", row[3], allowStale)
+                    return entry
+            if not allowStale:
+                self.stats["misses"] += 1
+            return None
+
+    def countHit(self, tier, stored, retried):
+        if retried:
+            self.stats["misses"] -= 1
+        if self.isFresh(stored):
+            self.stats[tier] += 1
+        else:
+            self.stats["staleHits"] += 1
+
+    def put(self, name, title, summary, exists):
+        key = normalizeTitle(name)
+        now = time.time()
+        entry = {"title": title, "summary": summary, "exists": exists, "stored": now}
+        with self.lock:
+            self.remember(key, entry)
+            self.stats["stores"] += 1
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)", (key, title, summary, int(exists), now, now))
+                count = self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+                if count > self.diskSize:
+                    self.db.execute("DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY accessed LIMIT ?)", (count - self.diskSize,))
+                    self.stats["evictions"] += count - self.diskSize
+                self.db.commit()
+        return entry
+
+    def purgeExpired(self):
+        if self.ttl is None:
+            return
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            for key in [k for (k, e) in self.memory.items() if e["stored"] < cutoff]:
+                del self.memory[key]
+            if self.db is not None:
+                self.db.execute("DELETE FROM pages WHERE stored < ?", (cutoff,))
+                self.db.commit()
+
+    def hitRate(self):
+        hits = self.stats["memoryHits"] + self.stats["diskHits"] + self.stats["staleHits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+class memoCache:
+    #Bounded LRU memo for pure functions like lemmatizing and tagging.
+    #Hits and misses aren't counted while quiet() returns True.
+    def __init__(self, size=10000, quiet=None):
+        self.size = size
+        self.quiet = quiet
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(self, key):
+        counted = self.quiet is None or not self.quiet()
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                if counted:
+                    self.stats["hits"] += 1
+                return (True, self.entries[key])
+            if counted:
+                self.stats["misses"] += 1
+            return (False, None)
+
+    def store(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get(self, key, compute):
+        (found, value) = self.lookup(key)
+        if not found:
+            value = compute()
+            self.store(key, value)
+        return value
+
+    def hitRate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
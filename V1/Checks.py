@@ -0,0 +1,276 @@
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from Libraries import *
+from Extract import extractHTML, extractChunks, extractRestSummary
+from Benchmark import chainedNormalize
+
+fixtureDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures")
+
+#Every check is a function that raises AssertionError when something is wrong
+checks = []
+
+def check(fn):
+    checks.append(fn)
+    return fn
+
+
+def startStubServer(delay=0, failing=(), hanging=(), hangFor=3):
+    #A stand-in for Wikipedia on a local port: /wiki/<name> is the fixture of
+    #that name (the missing page if there isn't one) after delay seconds.
+    #Titles in failing get a 503, titles in hanging get nothing for hangFor
+    #seconds. server.requests counts the requests made for each title.
+    class handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.split("/")[-1]
+            with server.lock:
+                server.requests[name] += 1
+            if name in hanging:
+                time.sleep(hangFor)
+                return
+            if name in failing:
+                self.send_error(503)
+                return
+            time.sleep(delay)
+            path = os.path.join(fixtureDir, name.lower() + ".html")
+            if not os.path.exists(path):
+                path = os.path.join(fixtureDir, "missing.html")
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200 if os.path.basename(path) != "missing.html" else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.lock = threading.Lock()
+    server.requests = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stubFacts(server, timeout=5, cache=None):
+    #A wikiFacts with its own cache and connection pool, fetching from server
+    facts = wikiFacts(cache=cache if cache is not None else pageCache(None), timeout=timeout,
+                      http=httpClient(timeout=timeout, backoff=0))
+    facts.baseURL = "http://127.0.0.1:%d/wiki/" % server.server_address[1]
+    return facts
+
+
+@check
+def httpCoalescing():
+    #Everyone asking for the same page at once shares one download
+    server = startStubServer(delay=0.3)
+    try:
+        facts = stubFacts(server)
+        callers = 8
+        ready = threading.Barrier(callers)
+        pages = []
+        def ask():
+            ready.wait()
+            pages.append(facts.fetchPage("Moon"))
+        threads = [threading.Thread(target=ask) for _ in range(callers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(pages) == callers and all(page is pages[0] for page in pages), "callers got different pages"
+        assert pages[0]["exists"] and pages[0]["title"] == "Moon - Wikipedia", pages[0]["title"]
+        assert server.requests["Moon"] == 1, "%d requests for one page" % server.requests["Moon"]
+    finally:
+        server.shutdown()
+
+
+@check
+def httpRetryThenStale():
+    #A 503 is retried, and once the retries run out an expired copy is served
+    server = startStubServer(failing=["Moon"])
+    try:
+        cache = pageCache(None, ttl=60)
+        entry = cache.put("Moon", "Moon - Wikipedia", "The Moon is Earth's only natural satellite.", True)
+        entry["stored"] -= 120
+        facts = stubFacts(server, cache=cache)
+        page = facts.fetchPage("Moon")
+        assert page is entry, "expected the stale entry, got %r" % page
+        assert server.requests["Moon"] == facts.http.retries + 1, "%d requests, expected %d" % (server.requests["Moon"], facts.http.retries + 1)
+        assert cache.stats["staleHits"] == 1 and cache.stats["misses"] == 0, cache.stats
+    finally:
+        server.shutdown()
+
+
+@check
+def httpTimeout():
+    #A server that never answers is given up on after the timeout, once
+    server = startStubServer(hanging=["Moon"], hangFor=3)
+    try:
+        facts = stubFacts(server, timeout=0.5)
+        started = time.monotonic()
+        try:
+            facts.fetchPage("Moon")
+        except lazyImport("requests").RequestException:
+            pass
+        else:
+            raise AssertionError("a hung fetch with nothing cached should raise")
+        elapsed = time.monotonic() - started
+        assert elapsed < 1.5, "took %.2fs with a 0.5s timeout" % elapsed
+        assert server.requests["Moon"] == 1, "read timeout retried %d times" % (server.requests["Moon"] - 1)
+    finally:
+        server.shutdown()
+
+
+#What each saved page must come out as: title, exists, and how the
+#summary starts and ends
+fixtureExpectations = {
+    "albert_einstein": ("Albert Einstein - Wikipedia", True, "Albert Einstein (/", "the world's most famous equation\"."),
+    "jupiter": ("Jupiter - Wikipedia", True, "Jupiter is the fifth planet from the Sun",
+                "more than 2.5 times that of all the other planets combined."),
+    "missing": ("Xyzzy - Wikipedia", False, "Wikipedia does not have an article with this exact name.",
+                "to check for alternative titles or spellings."),
+    "moon": ("Moon - Wikipedia", True, "The Moon is Earth's only natural satellite.",
+             "with its rotation period (lunar day) at 29.5 Earth days."),
+}
+
+
+@check
+def extractFixtures():
+    #Every saved page gives the expected title, exists and summary, whether
+    #it arrives whole or a few bytes at a time
+    names = sorted(name[:-5] for name in os.listdir(fixtureDir) if name.endswith(".html"))
+    assert names == sorted(fixtureExpectations), "fixtures without expectations: %s" % sorted(set(names) - set(fixtureExpectations))
+    for name in names:
+        (title, exists, start, end) = fixtureExpectations[name]
+        with open(os.path.join(fixtureDir, name + ".html"), "rb") as f:
+            raw = f.read()
+        e = extractHTML(raw.decode("utf-8"))
+        found = (e.getTitle(), e.checkExists(), e.getSummary())
+        assert found[0] == title, "%s: title %r" % (name, found[0])
+        assert found[1] == exists, "%s: exists %r" % (name, found[1])
+        assert found[2].startswith(start) and found[2].strip().endswith(end), "%s: summary %r" % (name, found[2])
+        #Nothing from the <style> blocks inside lead paragraphs
+        assert ".mw-parser-output" not in found[2] and "{" not in found[2], "%s: style text in summary" % name
+        for size in [1, 7, 1000]:
+            e = extractChunks(raw[i:i+size] for i in range(0, len(raw), size))
+            assert (e.getTitle(), e.checkExists(), e.getSummary()) == found, "%s: differs in %d byte chunks" % (name, size)
+    assert extractRestSummary({"type": "standard", "title": "Moon", "extract": "The Moon."}) == ("Moon", "The Moon.", True)
+    assert extractRestSummary({"type": "https://mediawiki.org/wiki/HyperSwitch/errors/not_found"})[2] is False
+
+
+@check
+def leadSentencesFuzz(trials=20000, seed=18):
+    #Fed a paragraph a piece at a time, leadSentences gives out exactly what
+    #numSentences(removeBrackets(paragraph), num) returns for the whole thing
+    rng = random.Random(seed)
+    alphabet = ["a", "b", " ", " ", ".", ":", ";", "(", ")", "[", "]", "1", "\u00e9"]
+    for _ in range(trials):
+        paragraph = "".join(rng.choice(alphabet) for _ in range(rng.randrange(0, 40)))
+        num = rng.randrange(1, 4)
+        lead = leadSentences(num)
+        pieces = []
+        cut = 0
+        while cut < len(paragraph):
+            cut = rng.randrange(cut, len(paragraph)) + 1
+            pieces.extend(lead.feed(paragraph[:cut], False))
+        pieces.extend(lead.feed(paragraph, True))
+        expected = numSentences(removeBrackets(paragraph), num)
+        assert "".join(pieces) == expected, "%r, num=%d: streamed %r, expected %r" % (paragraph, num, pieces, expected)
+
+
+def referenceType(n, wordTuple):
+    #getType as it was before the word tables: the list checks in order
+    (word, t) = wordTuple
+    if word in n.overridePronouns:
+        return "noun"
+    if word in n.yesnoWords:
+        return "yesno"
+    if word in n.greetings:
+        return "greeting"
+    for (tags, cls) in [(n.verbTypes, "verb"), (n.nounTypes, "noun"), (n.questionWords, "question"), (n.pronounTypes, "pronoun"),
+                        (n.adverbTypes, "adverb"), (n.adjectiveTypes, "adjective"), (n.multipliers, "multiplier"),
+                        (["CC"], "connector"), (["MD"], "modal"), (n.sentenceLengtheners, "irrelevant")]:
+        if t in tags or (cls == "verb" and word in n.overrideVerbs):
+            return cls
+    return t
+
+
+def referenceNegative(n, wordTuple):
+    score = False
+    for neg in n.negatives:
+        if "*" in neg:
+            if neg.replace("*", "") in wordTuple[0]:
+                score = not score
+        elif neg == wordTuple[0]:
+            score = not score
+    return score
+
+
+@check
+def classifyFuzz(trials=5000, seed=11):
+    #classify, getType and isNegative agree with the original list checks,
+    #including after the lists are changed and the tables recompiled
+    rng = random.Random(seed)
+    n = nlpTranslator(voice=False)
+    for trial in range(trials):
+        if trial == trials // 2:
+            n.negatives = n.negatives + ["never", "no", "*n't"]
+            n.overrideVerbs = n.overrideVerbs + ["hello"]
+            n.compileWordTables()
+        words = (n.overridePronouns + n.yesnoWords + n.greetings + n.overrideVerbs + n.negatives
+                 + ["cant", "dont", "nt", "not", "won't", "the", "cat", "ant", "xyz"])
+        tags = (n.verbTypes + n.nounTypes + n.questionWords + n.pronounTypes + n.adverbTypes + n.adjectiveTypes
+                + n.multipliers + n.sentenceLengtheners + ["CC", "MD", "UH", "FW", "."])
+        sentence = [(rng.choice(words), rng.choice(tags)) for _ in range(rng.randrange(0, 12))]
+        expected = ([referenceType(n, w) for w in sentence], [referenceNegative(n, w) for w in sentence])
+        assert n.classify(sentence) == expected, "%r: %r, expected %r" % (sentence, n.classify(sentence), expected)
+        assert (n.makeTypes(sentence), n.makeNegatives(sentence)) == expected, "%r: makeTypes/makeNegatives differ" % sentence
+
+
+@check
+def normalizeFuzz(trials=5000, seed=12):
+    #normalizeSentence gives what the chain of passes it replaced gives, on
+    #random sentences heavy in the cases it treats specially: runs of
+    #nouns, "how many", verbs and tokens it drops
+    rng = random.Random(seed)
+    n = nlpTranslator(voice=False)
+    words = [("how", "WRB"), ("many", "JJ"), ("cat", "NN"), ("dogs", "NNS"), ("paris", "NNP"), ("it", "PRP"),
+             ("is", "VBZ"), ("was", "VBD"), ("eating", "VBG"), ("born", "VBN"), ("the", "DT"), ("to", "TO"),
+             ("in", "IN"), ("2", "CD"), ("big", "JJ"), ("what", "WP"), ("can", "MD"), ("and", "CC"), ("very", "RB")]
+    for _ in range(trials):
+        tagged = [rng.choice(words) for _ in range(rng.randrange(0, 10))]
+        types = n.makeTypes(tagged)
+        expected = chainedNormalize(n, tagged, types)
+        actual = n.normalizeSentence(tagged, types)
+        assert actual == expected, "%r: fused %r, chained %r" % (tagged, actual, expected)
+
+
+def runChecks(names):
+    failed = []
+    for fn in checks:
+        if names and fn.__name__ not in names:
+            continue
+        started = time.perf_counter()
+        try:
+            fn()
+            print("ok    %-24s %6.2fs" % (fn.__name__, time.perf_counter() - started))
+        except Exception:
+            print("FAIL  %-24s %6.2fs" % (fn.__name__, time.perf_counter() - started))
+            traceback.print_exc()
+            failed.append(fn.__name__)
+    return failed
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Run the behaviour checks; exits non-zero if any fail")
+    parser.add_argument("names", nargs="*", help="only run these checks: " + ", ".join(fn.__name__ for fn in checks))
+    args = parser.parse_args()
+    failed = runChecks(args.names)
+    if failed:
+        print("\n%d check(s) failed: %s" % (len(failed), ", ".join(failed)))
+        sys.exit(1)
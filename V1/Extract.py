@@ -0,0 +1,170 @@
+import codecs
+import sys
+from html.parser import HTMLParser
+
+missingMarker = "does not have an article"
+
+
+class summaryExtractor(HTMLParser):
+    #Reads just enough of a Wikipedia page to get the title, the missing
+    #article marker and the first few paragraphs, then stops.
+    #Feed it the page in chunks and check done after each one.
+    def __init__(self, paragraphsWanted=5):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.paragraphsWanted = paragraphsWanted
+        self.title = None
+        self.missing = False
+        self.paragraphs = []
+        self.current = None
+        self.inTitle = False
+        self.titleText = []
+        self.boldDepth = 0
+        self.boldText = []
+        #Inside <script> or <style>, e.g. the TemplateStyles blocks in lead paragraphs
+        self.skipDepth = 0
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        #Whatever else was in the chunk that finished it is ignored, so the
+        #result doesn't depend on where the chunks were cut
+        if self.done:
+            return
+        if tag in ("script", "style"):
+            self.skipDepth += 1
+        elif tag == "title" and self.title is None:
+            self.inTitle = True
+        elif tag == "p":
+            #Paragraphs don't nest, an unclosed one ends where the next starts
+            if self.current is not None:
+                self.endParagraph()
+            self.current = []
+        elif tag == "b":
+            self.boldDepth += 1
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in ("script", "style"):
+            if self.skipDepth > 0:
+                self.skipDepth -= 1
+        elif tag == "title" and self.inTitle:
+            self.inTitle = False
+            self.title = "".join(self.titleText)
+        elif tag == "p" and self.current is not None:
+            self.endParagraph()
+        elif tag == "b" and self.boldDepth > 0:
+            self.boldDepth -= 1
+            if self.boldDepth == 0:
+                if missingMarker in "".join(self.boldText):
+                    #Done once the paragraph the marker is in is finished
+                    self.missing = True
+                    self.done = self.current is None
+                self.boldText = []
+
+    def handle_data(self, data):
+        #Like getText(), leave out what is in script and style tags
+        if self.done or self.skipDepth > 0:
+            return
+        if self.inTitle:
+            self.titleText.append(data)
+        if self.current is not None:
+            self.current.append(data)
+        if self.boldDepth > 0:
+            self.boldText.append(data)
+
+    def endParagraph(self):
+        self.paragraphs.append("".join(self.current))
+        self.current = None
+        if self.missing or (self.title is not None and len(self.paragraphs) >= self.paragraphsWanted):
+            self.done = True
+
+    def feed(self, data):
+        if not self.done:
+            HTMLParser.feed(self, data)
+
+    def close(self):
+        if not self.done:
+            HTMLParser.close(self)
+            if self.current is not None:
+                self.endParagraph()
+        self.done = True
+
+    def getTitle(self):
+        return self.title if self.title is not None else ""
+
+    def checkExists(self):
+        return not self.missing
+
+    def getSummary(self):
+        #Same choice as the old BeautifulSoup version: the second paragraph,
+        #or the next one with at least two sentences in it
+        styleCorrect = self.paragraphs
+        if len(styleCorrect) < 2:
+            return styleCorrect[0] if styleCorrect else ""
+        p = styleCorrect[1]
+        for i in range(2, min(len(styleCorrect), 5)):
+            if p.count(".") >= 2:
+                break
+            p = styleCorrect[i]
+        return p
+
+    def leadParagraph(self):
+        #The paragraph getSummary will end up choosing, as (text so far,
+        #complete), as soon as that can be told from what has arrived.
+        #None while it still depends on paragraphs that haven't.
+        if self.done:
+            return (self.getSummary(), True)
+        texts = list(self.paragraphs)
+        if self.current is not None:
+            texts.append("".join(self.current))
+        for i in range(1, min(len(texts), 5)):
+            complete = i < len(self.paragraphs)
+            if texts[i].count(".") >= 2 or i == 4:
+                return (texts[i], complete)
+            if not complete:
+                return None
+        return None
+
+
+def streamChunks(chunks, paragraphsWanted=5, encoding="utf-8"):
+    #Yields the extractor after every chunk, so callers can use what has
+    #arrived so far, and once more after it is closed (done is then True)
+    extractor = summaryExtractor(paragraphsWanted)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+        yield extractor
+    extractor.close()
+    yield extractor
+
+
+def extractChunks(chunks, paragraphsWanted=5, encoding="utf-8"):
+    for extractor in streamChunks(chunks, paragraphsWanted, encoding):
+        pass
+    return extractor
+
+
+def extractHTML(html, paragraphsWanted=5):
+    #Small chunks so the parser can stop well before the end of the page
+    return extractChunks((html[i:i+8192] for i in range(0, len(html), 8192)), paragraphsWanted)
+
+
+def extractRestSummary(data):
+    #Wikipedia's REST summary endpoint (api/rest_v1/page/summary/<title>)
+    #returns the lead section already stripped down, so no HTML parsing at all
+    title = data.get("title", "")
+    summary = data.get("extract", "")
+    exists = data.get("type") not in (None, "not_found", "https://mediawiki.org/wiki/HyperSwitch/errors/not_found")
+    return (title, summary, exists)
+
+
+if __name__=='__main__':
+    #Check the extractor against saved pages: python Extract.py page.html ...
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            e = extractHTML(f.read())
+        print("%s\n  title:   %s\n  exists:  %s\n  summary: %s" % (path, e.getTitle(), e.checkExists(), e.getSummary()))
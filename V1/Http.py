@@ -0,0 +1,106 @@
+import importlib
+import threading
+from concurrent.futures import Future
+from Metrics import metrics
+
+
+class inFlight:
+    #Lets everyone asking for the same key while it is being worked on
+    #wait for that one piece of work instead of starting their own
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+
+    def claim(self, key):
+        #(future, True) if the caller should do the work and finish() it,
+        #(future, False) if someone else already is
+        with self.lock:
+            future = self.running.get(key)
+            if future is not None:
+                return (future, False)
+            future = self.running[key] = Future()
+            return (future, True)
+
+    def finish(self, key, future, result=None, error=None):
+        with self.lock:
+            if self.running.get(key) is future:
+                del self.running[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run(self, key, work):
+        (future, owner) = self.claim(key)
+        if not owner:
+            metrics.count("http_coalesced_total")
+            return future.result()
+        try:
+            result = work()
+        except Exception as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+
+class httpClient:
+    #The one requests session every lookup goes through: kept-alive pooled
+    #connections, gzip, a couple of retries with backoff for connection
+    #errors and overloaded servers, and a default timeout so nothing can
+    #hang forever. A read that times out isn't retried, that would only
+    #multiply the wait. requests is only imported when the first request is made.
+    def __init__(self, timeout=5, retries=2, backoff=0.25, poolSize=16, userAgent="MrMainframe-Chatbot"):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.poolSize = poolSize
+        self.userAgent = userAgent
+        self.session = None
+        self.lock = threading.Lock()
+        self.inFlight = inFlight()
+
+    def getSession(self):
+        with self.lock:
+            if self.session is None:
+                requests = importlib.import_module("requests")
+                adapters = importlib.import_module("requests.adapters")
+                retry = importlib.import_module("urllib3.util.retry").Retry(
+                    total=self.retries, connect=self.retries, read=0, backoff_factor=self.backoff,
+                    status_forcelist=(429, 500, 502, 503, 504), allowed_methods=["GET", "HEAD"], raise_on_status=False)
+                session = requests.Session()
+                session.headers.update({"User-Agent": self.userAgent, "Accept-Encoding": "gzip, deflate"})
+                for prefix in ["https://", "http://"]:
+                    session.mount(prefix, adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.poolSize, max_retries=retry))
+                self.session = session
+        return self.session
+
+    def get(self, url, timeout=None, stream=False):
+        #A plain request, for streaming bodies. Use with a with block so the
+        #connection goes back to the pool.
+        return self.getSession().get(url, timeout=timeout if timeout is not None else self.timeout, stream=stream)
+
+    def fetch(self, url, timeout=None):
+        #Reads the whole body. Identical requests made while one is already
+        #running share its response, which must then be treated as read-only.
+        def download():
+            response = self.get(url, timeout)
+            response.content
+            return response
+        return self.inFlight.run(url, download)
+
+    def shared(self, key, work):
+        #Coalesces any work, like a fetch and parse, on key
+        return self.inFlight.run(key, work)
+
+    def claim(self, key):
+        return self.inFlight.claim(key)
+
+    def finish(self, key, future, result=None, error=None):
+        self.inFlight.finish(key, future, result, error)
+
+    def close(self):
+        with self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
@@ -0,0 +1,285 @@
+import argparse
+import bz2
+import difflib
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from Libraries import factSource, normalizeTitle
+from Cache import memoCache
+
+
+def openSource(path):
+    if path == "-":
+        return sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def readAbstracts(f):
+    #Wikipedia abstracts dump (enwiki-*-abstract.xml): <doc><title>Wikipedia: X</title>
+    #<url>..</url><abstract>..</abstract>..</doc>. Finished docs are cleared
+    #as we go so memory stays flat however big the dump is.
+    context = ElementTree.iterparse(f, events=("start", "end"))
+    root = None
+    for (event, elem) in context:
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == "doc":
+            title = elem.findtext("title") or ""
+            if title.startswith("Wikipedia: "):
+                title = title[len("Wikipedia: "):]
+            yield (title, elem.findtext("abstract") or "", elem.findtext("url") or "")
+            elem.clear()
+            root.clear()
+
+
+def readLines(f):
+    #title<TAB>summary per line, or JSON lines with title and summary/extract
+    for raw in f:
+        line = raw.decode("utf-8", errors="ignore").rstrip("\n")
+        if line.strip() == "":
+            continue
+        if line.startswith("{"):
+            data = json.loads(line)
+            yield (data.get("title", ""), data.get("summary", data.get("extract", "")), data.get("url", ""))
+        elif "\t" in line:
+            (title, summary) = line.split("\t", 1)
+            yield (title, summary, "")
+
+
+def readSource(path, format):
+    if format == "auto":
+        format = "xml" if ".xml" in os.path.basename(path) else "lines"
+    f = openSource(path)
+    try:
+        reader = readAbstracts if format == "xml" else readLines
+        for record in reader(f):
+            yield record
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+def buildIndex(path, out, format="auto", batch=5000):
+    if os.path.exists(out):
+        os.remove(out)
+    db = sqlite3.connect(out)
+    #Nothing to recover if a build dies halfway, so skip the journal
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    #length and rkey (the key backwards) are for fuzzy lookups, see localIndex.near
+    db.execute("CREATE TABLE pages (key TEXT PRIMARY KEY, title TEXT, summary TEXT, url TEXT, length INTEGER, rkey TEXT)")
+    rows = []
+    count = 0
+    start = time.time()
+    for (title, summary, url) in readSource(path, format):
+        title = title.strip()
+        if title == "":
+            continue
+        key = normalizeTitle(title)
+        rows.append((key, title, summary.strip(), url, len(key), key[::-1]))
+        if len(rows) >= batch:
+            db.executemany("INSERT OR IGNORE INTO pages VALUES (?, ?, ?, ?, ?, ?)", rows)
+            count += len(rows)
+            rows = []
+            print("\r%d entries" % count, end="", file=sys.stderr)
+    db.executemany("INSERT OR IGNORE INTO pages VALUES (?, ?, ?, ?, ?, ?)", rows)
+    count += len(rows)
+    print("\r%d entries, building title indexes" % count, file=sys.stderr)
+    db.execute("CREATE INDEX pagesPrefix ON pages (length, key)")
+    db.execute("CREATE INDEX pagesSuffix ON pages (length, rkey)")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+    print("done in %.1fs" % (time.time() - start), file=sys.stderr)
+    return count
+
+
+class localIndex:
+    #A read-only, memory-mapped index built by buildIndex. One is shared by
+    #every localFacts in the process.
+    def __init__(self, path, mmapSize=1 << 30, fuzzyCutoff=0.8):
+        self.path = path
+        self.fuzzyCutoff = fuzzyCutoff
+        self.db = sqlite3.connect("file:%s?mode=ro" % path, uri=True, check_same_thread=False)
+        self.db.execute("PRAGMA mmap_size = %d" % mmapSize)
+        self.lock = threading.Lock()
+        self.entries = memoCache(4096)
+        #Older indexes have no length/rkey columns and fall back to full text search
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(pages)")]
+        self.nearIndexed = "rkey" in columns
+        sql = self.db.execute("SELECT sql FROM sqlite_master WHERE name = 'titles'").fetchone()
+        self.trigrams = sql is not None and "trigram" in sql[0]
+
+    def exact(self, key):
+        with self.lock:
+            return self.db.execute("SELECT title, summary, url FROM pages WHERE key = ?", (key,)).fetchone()
+
+    def queries(self, words):
+        if self.trigrams:
+            #Any trigram of any word, best ranked first, so a title with
+            #one letter wrong still shares most of them
+            grams = []
+            for w in words:
+                for i in range(len(w) - 2):
+                    if w[i:i+3] not in grams:
+                        grams.append(w[i:i+3])
+            return [" OR ".join('"%s"' % g for g in grams)] if grams else []
+        terms = ['"%s"*' % w for w in words]
+        return [" AND ".join(terms), " OR ".join(terms)]
+
+    def near(self, key):
+        #Cut the key in three. One typo leaves two of the parts intact and
+        #changes the length by at most one (two is allowed for), so the
+        #candidates are keys of about the same length that start with the
+        #first two parts, end with the last two, or start with the first and
+        #end with the last, each a seek on an index. The last is read from
+        #whichever end turns out narrower, a few hundred rows at most, as a
+        #common first word ("list of") can start a great many titles; on
+        #short keys a typo in the middle scores under the cutoff anyway.
+        #Titles whose first words are the whole key ("isaac" for "Isaac
+        #Newton") are added too. That keeps it to a few dozen rows however
+        #big the index is.
+        a = len(key) // 3
+        b = len(key) - a
+        lengths = list(range(max(1, len(key) - 2), len(key) + 3))
+        marks = ",".join("?" * len(lengths))
+        rows = []
+        with self.lock:
+            for (column, start) in [("key", key[:b]), ("rkey", key[a:][::-1])]:
+                rows += self.seek(column, start, lengths, marks, 100)
+            if a >= 3:
+                #(column to seek on, its start, the other column's index in a row, its start)
+                for (column, start, other, otherStart) in [("key", key[:a], 3, key[b:][::-1]), ("rkey", key[b:][::-1], 4, key[:a])]:
+                    found = self.seek(column, start, lengths, marks, 500)
+                    rows += [row for row in found if row[other].startswith(otherStart)]
+                    if len(found) < 500:
+                        break
+            rows += self.db.execute("SELECT title, summary, url FROM pages WHERE key >= ? AND key < ? LIMIT 50",
+                                    (key + "_", key + "_\uffff")).fetchall()
+        return [row[:3] for row in rows]
+
+    def seek(self, column, start, lengths, marks, limit):
+        #Rows of about the right length whose key (or reversed key) starts
+        #with start, read off that column's index
+        index = "pagesPrefix" if column == "key" else "pagesSuffix"
+        sql = ("SELECT title, summary, url, rkey, key FROM pages INDEXED BY %s WHERE length IN (%s) AND %s >= ? AND %s < ? LIMIT %d"
+               % (index, marks, column, column, limit))
+        return self.db.execute(sql, lengths + [start, start + "\uffff"]).fetchall()
+
+    def similarity(self, matcher, words, title, floor):
+        #How close the whole title is, or just its first words, so "isaac"
+        #still finds "Isaac Newton". matcher already holds the name; the
+        #cheap upper bounds skip the full comparison for titles that can't
+        #beat floor.
+        title = title.lower()
+        score = 0.0
+        for candidate in set([title, " ".join(title.split()[:words])]):
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() >= floor and matcher.quick_ratio() >= floor:
+                score = max(score, matcher.ratio())
+        return score
+
+    def fuzzy(self, name):
+        #Candidates from near (or full text search on older indexes), then
+        #the closest title wins
+        name = name.lower()
+        if self.nearIndexed:
+            batches = [self.near(normalizeTitle(name))]
+        else:
+            batches = self.searchTitles(re.findall(r"\w+", name))
+        matcher = difflib.SequenceMatcher(None, "", name)
+        words = len(name.split())
+        for rows in batches:
+            best = None
+            bestScore = self.fuzzyCutoff
+            for row in rows:
+                score = self.similarity(matcher, words, row[0], bestScore)
+                #Ties go to the shorter title
+                if score > bestScore or (best is not None and score == bestScore and len(row[0]) < len(best[0])):
+                    (best, bestScore) = (row, score)
+            if best is not None:
+                return best
+        return None
+
+    def searchTitles(self, words):
+        #Candidates from the full text titles table of older indexes
+        for query in self.queries(words):
+            with self.lock:
+                rows = self.db.execute("SELECT pages.title, pages.summary, pages.url FROM titles JOIN pages ON pages.rowid = titles.rowid "
+                                       "WHERE titles MATCH ? ORDER BY rank LIMIT 50", (query,)).fetchall()
+            yield rows
+
+    def lookup(self, name, fuzzy=True):
+        #fuzzy=False only takes an exact title
+        key = normalizeTitle(name)
+        def find():
+            row = self.exact(key)
+            if row is None and fuzzy:
+                row = self.fuzzy(name.strip())
+            if row is None:
+                return {"title": "", "summary": "", "exists": False, "url": ""}
+            return {"title": row[0], "summary": row[1], "exists": True, "url": row[2]}
+        return self.entries.get((key, fuzzy), find)
+
+    def close(self):
+        self.db.close()
+
+
+class localFacts(factSource):
+    #Offline stand-in for wikiFacts, answering from a localIndex
+    def __init__(self, index):
+        factSource.__init__(self)
+        self.index = index
+    def fetchPage(self, name):
+        return self.index.lookup(name)
+    def urlFor(self, name):
+        return self.pageURL(self.index.lookup(name))
+    def pageURL(self, page):
+        if page["url"]:
+            return page["url"]
+        return "https://en.wikipedia.org/wiki/" + page["title"].replace(" ", "_")
+    def loadFirst(self, names):
+        #Every candidate gets an exact try before any of them is matched
+        #fuzzily, otherwise "moon born" (tried first, never a real title)
+        #would fuzzy match "Osborn" before "moon" was looked at
+        candidates = self.uniqueCandidates(names)
+        for fuzzy in [False, True]:
+            for name in candidates:
+                page = self.index.lookup(name, fuzzy)
+                if self.isUseful(page):
+                    self.fullURL = self.pageURL(page)
+                    self.page = page
+                    return name
+        return None
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Build or query a local knowledge index for offline answers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="ingest a Wikipedia abstracts dump or a title/summary file")
+    build.add_argument("source", help="enwiki-*-abstract.xml[.gz|.bz2], title<TAB>summary lines or JSON lines (- for stdin)")
+    build.add_argument("out", help="index file to write")
+    build.add_argument("--format", choices=["auto", "xml", "lines"], default="auto")
+    lookup = commands.add_parser("lookup", help="look a title up in an index")
+    lookup.add_argument("index")
+    lookup.add_argument("name", nargs="+")
+    args = parser.parse_args()
+    if args.command == "build":
+        buildIndex(args.source, args.out, args.format)
+    else:
+        index = localIndex(args.index)
+        start = time.perf_counter()
+        page = index.lookup(" ".join(args.name))
+        print("%s (%.2fms)\n%s" % (page["title"] if page["exists"] else "not found", (time.perf_counter() - start) * 1000, page["summary"]))
@@ -1,14 +1,234 @@
-import nltk as nlp
-from nltk import pos_tag as tag
 import sys
-from win32com.client import Dispatch
-from nltk.stem.wordnet import WordNetLemmatizer
+import importlib
+import time
+import threading
 import random
-import webbrowser
-import requests
-import bs4
 import re
 import string
+from concurrent.futures import ThreadPoolExecutor, Future
+from Cache import pageCache, memoCache, normalizeTitle
+from Speech import speechQueue, nullSpeech
+from Extract import streamChunks, extractRestSummary
+from Metrics import metrics, byteBuckets
+from Http import httpClient
+from Rules import ruleEngine, compileCondition, testCondition
+
+
+#nltk, wordnet and the HTTP stack take seconds to load, so nothing heavy is
+#imported until it is first used. startupTimes records what each one cost.
+startupTimes = {}
+
+def timeComponent(name, build):
+    start = time.perf_counter()
+    result = build()
+    startupTimes.setdefault(name, time.perf_counter() - start)
+    return result
+
+def lazyImport(name):
+    module = sys.modules.get(name)
+    if module is None:
+        module = timeComponent("import " + name, lambda: importlib.import_module(name))
+    return module
+
+def tokenize(s):
+    return lazyImport("nltk").word_tokenize(s)
+
+#Chat traffic repeats itself a lot, so lemmas and whole-utterance tags are
+#memoized for every nlpTranslator in the process
+#Prefetch parses run under metrics.quiet() and don't count towards the hit ratios
+lemmaCache = memoCache(20000, quiet=metrics.suppressed)
+tagCache = memoCache(20000, quiet=metrics.suppressed)
+
+def tag(tokens):
+    key = tuple(tokens)
+    return list(tagCache.get(key, lambda: tuple(lazyImport("nltk").pos_tag(list(key)))))
+
+def tagSents(sentences):
+    results = []
+    missing = []
+    for tokens in sentences:
+        (found, tagged) = tagCache.lookup(tuple(tokens))
+        results.append(list(tagged) if found else None)
+        if not found:
+            missing.append(tokens)
+    if missing:
+        fresh = iter(lazyImport("nltk").pos_tag_sents(missing))
+        for (i, tokens) in enumerate(sentences):
+            if results[i] is None:
+                tagged = tuple(next(fresh))
+                tagCache.store(tuple(tokens), tagged)
+                results[i] = list(tagged)
+    return results
+
+loadLock = threading.Lock()
+sharedLemmatizer = None
+
+def getLemmatizer():
+    global sharedLemmatizer
+    with loadLock:
+        if sharedLemmatizer is None:
+            sharedLemmatizer = timeComponent("lemmatizer", lambda: lazyImport("nltk.stem.wordnet").WordNetLemmatizer())
+    return sharedLemmatizer
+
+#Every fact source shares one connection pool, and identical requests in
+#flight at the same time (from other sessions or the prefetcher) share a fetch
+sharedHttp = httpClient()
+
+#A command looks up at most this many candidate titles at once
+lookupsPerCommand = 4
+lookupPool = ThreadPoolExecutor(max_workers=2 * lookupsPerCommand)
+
+def sizeLookupPool(commands):
+    #Room for every command that can be running at once to fetch all of its
+    #candidates without queueing behind somebody else's
+    global lookupPool
+    (old, lookupPool) = (lookupPool, ThreadPoolExecutor(max_workers=commands * lookupsPerCommand))
+    old.shutdown(wait=False)
+
+metrics.gauge("lemma_cache_hit_ratio", lemmaCache.hitRate, "share of verb lemmas served from the memo")
+metrics.gauge("tag_cache_hit_ratio", tagCache.hitRate, "share of utterances whose tags came from the memo")
+
+#Kept apart from lookupPool so background prefetching never queues ahead
+#of a lookup someone is waiting for
+prefetchPool = ThreadPoolExecutor(max_workers=2)
+
+sharedPageCache = None
+
+def getPageCache():
+    global sharedPageCache
+    with loadLock:
+        if sharedPageCache is None:
+            sharedPageCache = pageCache()
+            metrics.gauge("page_cache_hit_ratio", sharedPageCache.hitRate, "share of page lookups answered from the cache")
+            metrics.gauge("page_cache_misses", lambda: sharedPageCache.stats["misses"])
+    return sharedPageCache
+
+roundBrackets = re.compile(r" ?\([^)]+\)")
+squareBrackets = re.compile(r"\[[^]]+\]")
+sentencePatterns = {}
+
+def removeBrackets(s):
+    try:
+        s = s.encode("ascii", errors="ignore").decode("utf-8")
+    except:
+        s.decode("utf-8")
+    rex = roundBrackets.sub("", s)
+    rex = squareBrackets.sub("", rex)
+    rex = rex.replace(")", "").replace("(", "")
+    return rex
+
+def numSentences(s, num):
+    pattern = sentencePatterns.get(num)
+    if pattern is None:
+        pattern = sentencePatterns.setdefault(num, re.compile(r'(?:[^.:;]+[.:;]){'+str(num)+r'}'))
+    try:
+        return pattern.match(s).group()
+    except:
+        return s
+
+sentenceSegment = re.compile(r"[^.:;]+[.:;]")
+
+class leadSentences:
+    #Cuts numSentences(removeBrackets(paragraph), num) into sentences while
+    #the paragraph is still arriving. Only the text before the first bracket
+    #that hasn't closed yet is cleaned, so later text can't change what has
+    #already been given out. Joined back together the pieces are exactly
+    #what numSentences would have returned.
+    def __init__(self, num):
+        self.num = num
+        self.emitted = 0
+        self.offset = 0
+        self.stuck = False
+        self.finished = False
+
+    def beforeOpen(self, s, opening, closing):
+        i = s.find(opening, s.rfind(closing) + 1)
+        if i == -1:
+            return s
+        if opening == "(" and i > 0 and s[i-1] == " ":
+            i -= 1
+        return s[:i]
+
+    def clean(self, raw):
+        #removeBrackets, for as much of raw as is settled
+        s = raw.encode("ascii", errors="ignore").decode("utf-8")
+        s = roundBrackets.sub("", self.beforeOpen(s, "(", ")"))
+        s = squareBrackets.sub("", self.beforeOpen(s, "[", "]"))
+        return s.replace(")", "").replace("(", "")
+
+    def feed(self, raw, complete):
+        #raw is the whole paragraph so far, complete once it has all arrived
+        if self.finished:
+            return []
+        cleaned = removeBrackets(raw) if complete else self.clean(raw)
+        pieces = []
+        while self.emitted < self.num and not self.stuck:
+            m = sentenceSegment.match(cleaned, self.offset)
+            if m is None:
+                #An empty sentence means numSentences won't match at all
+                self.stuck = cleaned[self.offset:self.offset+1] in (".", ":", ";")
+                break
+            pieces.append(m.group())
+            self.offset = m.end()
+            self.emitted += 1
+        if complete:
+            self.finished = True
+            #Fewer than num sentences and numSentences gives back the lot
+            if self.emitted < self.num and self.offset < len(cleaned):
+                pieces.append(cleaned[self.offset:])
+        return pieces
+
+class articleFacts:
+    #Everything the answers need from one summary, worked out once per
+    #article instead of every time a question about it is asked
+    def __init__(self, summary):
+        self.cleaned = removeBrackets(summary)
+        self.sentences = self.cleaned.split(".")
+        self.digitSentences = [i for (i, sent) in enumerate(self.sentences) if any(char.isdigit() for char in sent)]
+        self.keywords = {}
+        for (i, sent) in enumerate(self.sentences):
+            for word in set(re.findall(r"\w+", sent)):
+                self.keywords.setdefault(word, []).append(i)
+        self.leads = {}
+
+    def lead(self, num):
+        if num not in self.leads:
+            self.leads[num] = numSentences(self.cleaned, num)
+        return self.leads[num]
+
+    def firstNumber(self):
+        if not self.digitSentences:
+            return ""
+        return self.sentences[self.digitSentences[0]] + "."
+
+    def mentioning(self, word):
+        return "".join("." + self.sentences[i] for i in self.keywords.get(word, []))
+
+#Replies to statements. Handlers get the statement's slots and the
+#translator and return a plan for executeReply. The generic answer and
+#subject replies sit in a lower priority tier so any intent added with the
+#default priority is tried before them.
+statementIntents = ruleEngine()
+
+@statementIntents.rule("verb:be,subject:i,adjective:hungry")
+def hungryIntent(stat, n):
+    return {"action": "browse", "choices": ["Ur so lazy. Why do i have to do everything?", "Here you go", "I have found these", "Here are some restaurants near you"],
+            "url": "https://www.google.co.uk/search?client=opera&q=restaurants+near+me&sourceid=opera&ie=UTF-8&oe=UTF-8"}
+
+@statementIntents.rule("answer", priority=-1)
+def answerIntent(stat, n):
+    return {"action": "say", "choices": ["Ok", "Sure", "Right", "I understand"]}
+
+@statementIntents.rule("subject", priority=-1)
+def subjectIntent(stat, n):
+    return {"action": "say", "choices": ["Good for "+n.flip(stat['subject']), "OK", "Cool", "Great"]}
+
+@statementIntents.otherwise
+def defaultIntent(stat, n):
+    return {"action": "say", "choices": ["Ok", "Great", "Cool"]}
+
+#Parsed template indexes, shared by every translator using the same templates
+compiledTemplates = {}
 
 
 tagsABCDEFG = '''CC	coordinating conjunction
@@ -51,8 +271,10 @@ WRB	wh-abverb	where, when'''
 
 
 class nlpTranslator:
-    def __init__(self):
+    def __init__(self, voice=True, speech=None, facts=None):
         self.continualSubject = ""
+        self.prefetch = prefetcher()
+        self.followUps = ["when was %s born", "how many %s are there", "where is %s", "what is %s"]
         self.quitWords = ["quit", "goodbye", "bye", "exit", "terminate", "cya", "see ya", "close"]
         self.stripPunc = str.maketrans('','','!\"\\£$%^&*()_+=-[]}{\'@~#:;.,<>?/')
         self.verbTypes = ["VB", "VBG", "VBD", "VBN", "VBP", "VBZ"]
@@ -68,10 +290,12 @@ class nlpTranslator:
         self.greetings = ["hello", "hi", "sup", "wasup", "hey", "morning", "yo", "wassup"]
         self.sentenceLengtheners = ["DT", "EX", "TO", "IN"]
         self.multipliers = ["CD"]
-        self.speak = Dispatch("SAPI.SpVoice")
-        self.lemmatizer = WordNetLemmatizer()
-        self.wikiFactoriser = wikiFacts()
-        self.googleFactoriser = googleFacts()
+        self.intents = statementIntents
+        self.speech = speechQueue(speech if voice else nullSpeech())
+        #Called to make the fact source on first use, e.g. lambda: localFacts(index)
+        self.factsFactory = facts
+        self.wikiInstance = None
+        self.googleInstance = None
         self.sentenceObjects = ["subject", "verb", "object", "greeting", "adverb", "modal", "user", "question", "adjective", "answer"]
         self.statements = [
         "pronoun$user noun$subject verb$verb adjective$adjective",
@@ -108,9 +332,24 @@ class nlpTranslator:
          "question$question verb$modal adjective$subject verb$verb",
          "question$question noun$object noun$subject"
          ]
+        self.compileWordTables()
+        self.statementIndex = self.compileTemplates(self.statements)
+        self.questionIndex = self.compileTemplates(self.questions)
+
+    @property
+    def wikiFactoriser(self):
+        if self.wikiInstance is None:
+            self.wikiInstance = timeComponent("wikiFacts", self.factsFactory if self.factsFactory is not None else wikiFacts)
+        return self.wikiInstance
+
+    @property
+    def googleFactoriser(self):
+        if self.googleInstance is None:
+            self.googleInstance = googleFacts()
+        return self.googleInstance
 
     def normalizeVerb(self, verb):
-        return self.lemmatizer.lemmatize(verb, 'v')
+        return lemmaCache.get(verb, lambda: getLemmatizer().lemmatize(verb, 'v'))
 
 
     def normalizeAllVerbs(self, sentence, types):
@@ -161,23 +400,57 @@ class nlpTranslator:
                 nsimp.append(simpleTypes[i])
         return (nsent, nsimp)
 
+    def normalizeSentence(self, sentence, simpleTypes):
+        #normalizeAllVerbs, mergeNouns, removeIrrelevant and mergeHowMany in
+        #a single left to right pass, writing straight into the output lists
+        outSent = []
+        outTypes = []
+        count = len(sentence)
+        i = 0
+        while i < count:
+            (word, t) = sentence[i]
+            cls = simpleTypes[i]
+            if cls == "verb":
+                word = self.normalizeVerb(word)
+            if cls == "noun" and i + 1 < count and simpleTypes[i+1] == "noun":
+                word = word + " " + sentence[i+1][0]
+                i += 2
+            else:
+                i += 1
+            if cls == "irrelevant" or cls == "multiplier":
+                continue
+            if word == "many" and outSent and outSent[-1][0] == "how":
+                outSent[-1] = ("how many", outSent[-1][1])
+                continue
+            outSent.append((word, t))
+            outTypes.append(cls)
+        return (outSent, outTypes)
+
+    def compileTemplates(self, sentenceStructs):
+        #Maps the tuple of simple types to the first template with that shape,
+        #so formatSentence is a single dict lookup instead of a scan
+        structs = tuple(sentenceStructs)
+        if structs in compiledTemplates:
+            return compiledTemplates[structs]
+        index = {}
+        for struct in structs:
+            halves = [w.split("$") for w in struct.split(" ")]
+            key = tuple(h[0] for h in halves)
+            if key not in index:
+                index[key] = (struct, tuple(h[1] for h in halves))
+        compiledTemplates[structs] = index
+        return index
+
+    def matchTemplate(self, sentence, simpleTypes, index):
+        found = index.get(tuple(simpleTypes))
+        if found is None:
+            return (None, None)
+        return (found[0], self.fillSlots(found, sentence))
+
     def formatSentence(self, sentence, simpleTypes, sentenceStructs):
-        for struct in sentenceStructs:
-            split = struct.split(" ")
-            if len(split) == len(sentence):
-                failed = False
-                out = {}
-                for (i, w) in enumerate(split):
-                    halves = w.split("$")
-                    varName = halves[1]
-                    varType = halves[0]
-                    if varType == simpleTypes[i]:
-                        out[varName] = sentence[i][0]
-                    else:
-                        failed = True
-                if not failed:
-                    return out
-        return None
+        if isinstance(sentenceStructs, list):
+            sentenceStructs = self.compileTemplates(sentenceStructs)
+        return self.matchTemplate(sentence, simpleTypes, sentenceStructs)[1]
 
     def removeIrrelevant(self, sentence, basicTypes):
         new = []
@@ -189,59 +462,68 @@ class nlpTranslator:
         return (new, newTypes)
 
 
-    def getType(self, wordTuple):
-        if wordTuple[0] in self.overridePronouns:
-            return "noun"
-        if wordTuple[0] in self.yesnoWords:
-            return "yesno"
-        if wordTuple[0] in self.greetings:
-            return "greeting"
-        if wordTuple[1] in self.verbTypes or wordTuple[0] in self.overrideVerbs:
-            return "verb"
-        if wordTuple[1] in self.nounTypes:
-            return "noun"
-        if wordTuple[1] in self.questionWords:
-            return "question"
-        if wordTuple[1] in self.pronounTypes:
-            return "pronoun"
-        if wordTuple[1] in self.adverbTypes:
-            return "adverb"
-        if wordTuple[1] in self.adjectiveTypes:
-            return "adjective"
-        if wordTuple[1] in self.multipliers:
-            return "multiplier"
-        if wordTuple[1] == "CC":
-            return "connector"
-        if wordTuple[1] == "MD":
-            return "modal"
-        if wordTuple[1] in self.sentenceLengtheners:
-            return "irrelevant"
-        else:
-            return wordTuple[1]
-
-    def isNegative(self, wordTuple):
-        score = False
+    def compileWordTables(self):
+        #Flattens the word and tag lists into dicts so a token is classified
+        #with at most two lookups. Call again after changing any of the lists.
+        wordClass = {}
+        for (words, cls) in [(self.overridePronouns, "noun"), (self.yesnoWords, "yesno"), (self.greetings, "greeting"), (self.overrideVerbs, "verb")]:
+            for w in words:
+                wordClass.setdefault(w, cls)
+        tagClass = {}
+        for (tags, cls) in [(self.verbTypes, "verb"), (self.nounTypes, "noun"), (self.questionWords, "question"),
+                            (self.pronounTypes, "pronoun"), (self.adverbTypes, "adverb"), (self.adjectiveTypes, "adjective"),
+                            (self.multipliers, "multiplier"), (["CC"], "connector"), (["MD"], "modal"), (self.sentenceLengtheners, "irrelevant")]:
+            for t in tags:
+                tagClass.setdefault(t, cls)
+        #Every entry in negatives flips the score, so only the parity matters
+        negativeWords = {}
+        negativePatterns = []
         for n in self.negatives:
             if "*" in n:
-                n2 = n.replace("*", "")
-                if n2 in wordTuple[0]:
-                    score = not score
+                negativePatterns.append(re.compile(re.escape(n.replace("*", ""))))
             else:
-                if n == wordTuple[0]:
-                    score = not score
+                negativeWords[n] = not negativeWords.get(n, False)
+        self.wordClass = wordClass
+        self.tagClass = tagClass
+        self.negativeWords = negativeWords
+        self.negativePatterns = negativePatterns
+
+    def getType(self, wordTuple):
+        cls = self.wordClass.get(wordTuple[0])
+        if cls is not None:
+            return cls
+        return self.tagClass.get(wordTuple[1], wordTuple[1])
+
+    def isNegative(self, wordTuple):
+        score = self.negativeWords.get(wordTuple[0], False)
+        for pattern in self.negativePatterns:
+            if pattern.search(wordTuple[0]):
+                score = not score
         return score
 
-    def makeTypes(self, tupleList):
+    def classify(self, tupleList):
+        #Types and negation flags together in one pass over the sentence
+        wordClass = self.wordClass
+        tagClass = self.tagClass
+        negativeWords = self.negativeWords
+        negativePatterns = self.negativePatterns
         types = []
-        for i in tupleList:
-            types.append(self.getType(i))
-        return types
+        negs = []
+        for (word, t) in tupleList:
+            cls = wordClass.get(word)
+            types.append(cls if cls is not None else tagClass.get(t, t))
+            score = negativeWords.get(word, False)
+            for pattern in negativePatterns:
+                if pattern.search(word):
+                    score = not score
+            negs.append(score)
+        return (types, negs)
+
+    def makeTypes(self, tupleList):
+        return [self.getType(i) for i in tupleList]
 
     def makeNegatives(self, tupleList):
-        negs = []
-        for i in tupleList:
-            negs.append(self.isNegative(i))
-        return negs
+        return [self.isNegative(i) for i in tupleList]
 
     def flip(self, word):
         if word == "me":return "you"
@@ -258,6 +540,17 @@ class nlpTranslator:
 
         return word
 
+    def sayStream(self, pieces):
+        #Says each piece as soon as the generator produces it and returns
+        #whatever the generator returns
+        while True:
+            try:
+                piece = next(pieces)
+            except StopIteration as stop:
+                return stop.value
+            if piece.strip() != "":
+                self.say(piece.strip())
+
     def say(self, s):
         #s = str(s.encode("utf-8"))
         try:
@@ -269,211 +562,534 @@ class nlpTranslator:
             sp = sp.replace(".", ", ")
         except:
             pass
-        self.speak.Speak(sp)
+        self.speech.enqueue(sp)
 
     def testStucture(self, sent, struc):
         try:
             sentTypes = sent.keys()
         except:
             return False
-        conditions = struc
-        conditionalObjects = conditions.split(",")
-        for o in conditionalObjects:
-            if ":" in o:
-                kvp = o.split(":")
-                k = kvp[0]
-                v = kvp[1]
-                if not k in sent.keys():
-                    return False
-                if not v == sent[k]:
-                    return False
-            else:
-                k = o
-                if not k in sent.keys():
-                    return False
-        return True
+        return testCondition(sent, compileCondition(struc))
 
     def removeBrackets(self, s):
-        try:
-            s = s.encode("ascii", errors="ignore").decode("utf-8")
-        except:
-            s.decode("utf-8")
-        rex = re.sub(r" ?\([^)]+\)", "", s)
-        rex = re.sub(r"\[[^]]+\]", "", rex)
-        rex = rex.replace(")", "").replace("(", "")
-        return rex
+        return removeBrackets(s)
 
     def numSentences(self, s, num):
-        try:
-            return re.match(r'(?:[^.:;]+[.:;]){'+str(num)+r'}', s).group()
-        except:
-            return s
+        return numSentences(s, num)
+
+    def readAnswer(self):
+        ans = input("YOU>> ")
+        self.speech.interrupt()
+        return ans
+
+    def openURL(self, url):
+        lazyImport("webbrowser").open(url)
 
     def question(self, ques):
         self.say(ques)
-        ans = input("YOU>> ")
-        if ans in ["yes", "ye", "yeah", "sure", "why not", "ok", "y"]:
-            return True
-        else:
-            return False
+        return self.isYes(self.readAnswer())
 
-    def proscessCommand(self, s):
-        rawInputCache = s
+    def isYes(self, ans):
+        return ans in ["yes", "ye", "yeah", "sure", "why not", "ok", "y"]
+
+    def offerMore(self):
+        #Asks whether to open the page just answered from. Interfaces that
+        #can't sit waiting for the answer override this.
+        if self.question("Do you want to learn more?"):
+            self.openPage(self.wikiFactoriser.fullURL, self.wikiFactoriser.getTitle())
+
+    def openPage(self, url, title):
+        self.openURL(url)
+        self.say("Opening "+str(title))
+
+    def fixTokens(self, tokens):
+        #Builds a new list rather than removing/inserting while iterating,
+        #which used to skip the token after every negative or "im"
+        fixed = []
+        negScore = False
+        for t in tokens:
+            if self.isNegative((t, "NN")):
+                negScore = not negScore
+            elif t == "im":
+                fixed.append("i")
+                fixed.append("am")
+            else:
+                fixed.append(t)
+        return (fixed, negScore)
+
+    def tokenizeCommand(self, s):
         s = s.translate(self.stripPunc).lower()
         if s in self.quitWords:
-            self.say("I don't want to close")
-        else:
-            negScore = False
-            tokens = nlp.word_tokenize(s)
-            for (i,t) in enumerate(tokens):
-                if self.isNegative((t, "NN")):
-                    tokens.remove(t)
-                    negScore = not negScore
-                elif t == "im":
-                    tokens.remove(t)
-                    tokens.insert(i, "am")
-                    tokens.insert(i, "i")
+            return (s, None, False)
+        (tokens, negScore) = self.fixTokens(tokenize(s))
+        return (s, tokens, negScore)
+
+    def parseTagged(self, tagged):
+        started = metrics.start()
+        (taggedTypes, taggedNegatives) = self.classify(tagged)
+        metrics.observe("stage_seconds", started, ("stage", "classify"))
+        started = metrics.start()
+        (tagged, taggedTypes) = self.normalizeSentence(tagged, taggedTypes)
+        metrics.observe("stage_seconds", started, ("stage", "normalize"))
+        started = metrics.start()
+        (statTemplate, stat) = self.matchTemplate(tagged, taggedTypes, self.statementIndex)
+        (quesTemplate, ques) = self.matchTemplate(tagged, taggedTypes, self.questionIndex)
+        metrics.observe("stage_seconds", started, ("stage", "formatSentence"))
+        if metrics.enabled:
+            if statTemplate is not None:
+                metrics.count("template_matches_total", ("kind", "statement", "template", statTemplate))
+            elif quesTemplate is not None:
+                metrics.count("template_matches_total", ("kind", "question", "template", quesTemplate))
+            else:
+                metrics.count("template_matches_total", ("kind", "none", "template", ""))
+        return {"tagged": tagged, "types": taggedTypes, "negatives": taggedNegatives,
+                "statement": stat, "statementTemplate": statTemplate,
+                "question": ques, "questionTemplate": quesTemplate}
+
+    def parseCommand(self, s, tagged=None, prepared=None):
+        #Everything up to deciding on a reply, with no side effects.
+        #Pass prepared (what tokenizeCommand returned) and tagged in when
+        #the line has already been tokenized and tagged in bulk
+        if prepared is None:
+            started = metrics.start()
+            prepared = self.tokenizeCommand(s)
+            metrics.observe("stage_seconds", started, ("stage", "tokenize"))
+        (cleaned, tokens, negScore) = prepared
+        if tokens is None:
+            return {"raw": s, "quit": True}
+        if tagged is None:
+            started = metrics.start()
             tagged = tag(tokens)
-            taggedTypes = self.makeTypes(tagged)
-
-            #self.say(tagged)
-            tagged = self.normalizeAllVerbs(tagged, taggedTypes)
-            merged = self.mergeNouns(tagged, taggedTypes)
-            tagged = merged[0]
-            taggedTypes = merged[1]
-            tup = self.removeIrrelevant(tagged, taggedTypes)
-            tagged = tup[0]
-            taggedTypes = tup[1]
-            merged = self.mergeHowMany(tagged, taggedTypes)
-            tagged = merged[0]
-            taggedTypes = merged[1]
-            stat = self.formatSentence(tagged, taggedTypes, self.statements)
-            ques = self.formatSentence(tagged, taggedTypes, self.questions)
-            if len(tagged) == 0:
-                self.say("you didn't write anything")
-            elif tagged[0][0] == "say":
-                self.say(rawInputCache.replace("say ","",1))
-            elif not stat == None:
-                #self.say(stat)
-                ##Special commmands
-                if self.testStucture(stat, "verb:be,subject:i,adjective:hungry"):
-                    self.say(["Ur so lazy. Why do i have to do everything?", "Here you go", "I have found these", "Here are some restaurants near you"][random.randrange(0, 4)])
-                    webbrowser.open("https://www.google.co.uk/search?client=opera&q=restaurants+near+me&sourceid=opera&ie=UTF-8&oe=UTF-8")
-                elif self.testStucture(stat, "answer"):self.say(["Ok", "Sure", "Right", "I understand"][random.randrange(0, 4)])
-                elif self.testStucture(stat, "subject"):
-                    d=["Good for "+self.flip(stat['subject']), "OK", "Cool", "Great"][random.randrange(0, 4)]
-                    print(d)
-                    self.say(d)
-                else:
-                    s = ["Ok", "Great", "Cool"][random.randrange(0,3)]
-                    print(s)
-                    self.speak(s)
-            elif not ques == None:
-                #self.say("Questions have not been fully implemented yet")
-                #self.say(ques)
-                sub = ques['subject']+" " if 'subject' in ques.keys() else ""
-                adj = ques['adjective']+" " if 'adjective' in ques.keys() else ""
-                pro = ques['pronoun']+" " if 'pronoun' in ques.keys() else ""
-                obj = ques['object']+" " if 'object' in ques.keys() else ""
-                vrb = ques["verb"] if 'verb' in ques.keys() else ""
-                vrb = "" if vrb == "be" else vrb
-                if ques["question"] in ["what","who", "how", "when", "where", "how many"]:
-                    search = adj+pro+sub+obj+ vrb
-                    self.wikiFactoriser.loadPage(search)
-                    exists = self.wikiFactoriser.checkExists()
-                    if not exists:
-                        search2 = sub
-                        self.wikiFactoriser.loadPage(search2)
-                        exists = self.wikiFactoriser.checkExists()
-                    if (not exists) or (self.wikiFactoriser.getSummary().replace(" ", "").replace("\n", "") == ""):
-                        self.say("I don't know anything about "+search +" or "+search2)
-                    else:
-                        if ques['question'] in ["what", "who"]:
-                            self.say(self.numSentences(self.removeBrackets(self.wikiFactoriser.getSummary()), 2))
-                        elif ques["question"] == "when":
-                            sents = self.removeBrackets(self.wikiFactoriser.getSummary()).split(".")
-                            #print(sents)
-                            useful = ""
-                            for s in sents:
-                                #check for number
-                                if any(char.isdigit() for char in s):
-                                    useful = useful+s+"."
-                                break
-                            if useful == "":
-                                self.say("I am not sure about the date, but i have found an article")
-                                #self.say(tagged)
-                            else:
-                                self.say(useful)
-                        elif ques["question"] == "how many":
-                            sents = self.removeBrackets(self.wikiFactoriser.getSummary()).split(".")
-                            #print(sents)
-                            useful = ""
-                            for s in sents:
-                                #check for number
-                                if any(char.isdigit() for char in s):
-                                    useful = useful+s+"."
-                                break
-                            if useful == "":
-                                self.say("I am not sure about any numbers, but i have found an article")
-                                #self.say(tagged)
-                            else:
-                                self.say(useful)
-                        else:
-                            sents = self.removeBrackets(self.wikiFactoriser.getSummary()).split(".")
-                            #print(sents)
-                            useful = ""
-                            for s in sents:
-                                if ques["question"] in s:
-                                    useful = useful+"."+s
-                            self.say(useful)
-                        learnMore = self.question("Do you want to learn more?")
-                        if learnMore:
-                            webbrowser.open(self.wikiFactoriser.fullURL)
-                            self.say("Opening "+str(self.wikiFactoriser.getTitle()))
-                else:
-                    self.say("I'm not sure how to answer that")
+            metrics.observe("stage_seconds", started, ("stage", "tag"))
+        parsed = self.parseTagged(tagged)
+        parsed.update({"raw": s, "quit": False, "tokens": tokens, "negative": negScore})
+        return parsed
+
+    def parseMany(self, utterances, workers=None, chunk=5000):
+        #Bulk version of parseCommand that only returns the statement and
+        #question slots. Repeated utterances are parsed once, tagging is a
+        #single pos_tag_sents call and each distinct type signature is looked
+        #up in the template indexes once. workers > 1 splits big inputs over
+        #a process pool.
+        utterances = list(utterances)
+        if workers is not None and workers > 1 and len(utterances) > chunk:
+            from concurrent.futures import ProcessPoolExecutor
+            parts = [utterances[i:i+chunk] for i in range(0, len(utterances), chunk)]
+            with ProcessPoolExecutor(workers) as pool:
+                return [result for part in pool.map(parseManyPart, parts) for result in part]
+        unique = {}
+        for u in utterances:
+            if u not in unique:
+                unique[u] = len(unique)
+        prepared = [self.tokenizeCommand(u)[1] for u in unique]
+        tagged = iter(tagSents([tokens for tokens in prepared if tokens is not None]))
+        wordClass = self.wordClass
+        tagClass = self.tagClass
+        sentences = []
+        signatures = {}
+        for tokens in prepared:
+            if tokens is None:
+                sentences.append(None)
+                continue
+            #Only the types are needed here, so skip the negation scan classify does
+            sentence = next(tagged)
+            types = [wordClass.get(word) or tagClass.get(t, t) for (word, t) in sentence]
+            sentence = self.normalizeSentence(sentence, types)
+            sentences.append(sentence)
+            signature = tuple(sentence[1])
+            if signature not in signatures:
+                signatures[signature] = (self.statementIndex.get(signature), self.questionIndex.get(signature))
+        parsed = []
+        for sentence in sentences:
+            if sentence is None:
+                parsed.append({"statement": None, "question": None})
+                continue
+            (stat, ques) = signatures[tuple(sentence[1])]
+            parsed.append({"statement": self.fillSlots(stat, sentence[0]), "question": self.fillSlots(ques, sentence[0])})
+        return [dict((k, None if v is None else dict(v)) for (k, v) in parsed[unique[u]].items()) for u in utterances]
+
+    parse_many = parseMany
+
+    def fillSlots(self, found, sentence):
+        if found is None:
+            return None
+        out = {}
+        for (varName, word) in zip(found[1], sentence):
+            out[varName] = word[0]
+        return out
+
+    def planReply(self, parsed):
+        #Describes what proscessCommand would do, without doing it
+        if parsed["quit"]:
+            return {"action": "say", "text": "I don't want to close"}
+        tagged = parsed["tagged"]
+        stat = parsed["statement"]
+        ques = parsed["question"]
+        if len(tagged) == 0:
+            return {"action": "say", "text": "you didn't write anything"}
+        elif tagged[0][0] == "say":
+            return {"action": "say", "text": parsed["raw"].replace("say ","",1)}
+        elif not stat == None:
+            ##Special commmands, see statementIntents
+            return self.intents.dispatch(stat, self)
+        elif not ques == None:
+            sub = ques['subject']+" " if 'subject' in ques.keys() else ""
+            adj = ques['adjective']+" " if 'adjective' in ques.keys() else ""
+            pro = ques['pronoun']+" " if 'pronoun' in ques.keys() else ""
+            obj = ques['object']+" " if 'object' in ques.keys() else ""
+            vrb = ques["verb"] if 'verb' in ques.keys() else ""
+            vrb = "" if vrb == "be" else vrb
+            #Some question templates ("can i eat pizza") have no question word
+            if ques.get("question") in ["what","who", "how", "when", "where", "how many"]:
+                search = adj+pro+sub+obj+ vrb
+                return {"action": "lookup", "question": ques["question"], "search": search, "fallback": sub,
+                        "candidates": [search, adj+pro+sub+obj, sub+obj, sub]}
             else:
-                self.say("Im not sure what that meant")
-                self.say(tagged)
-            #self.say(taggedNegatives)
+                return {"action": "say", "text": "I'm not sure how to answer that"}
+        else:
+            return {"action": "say", "text": "Im not sure what that meant", "debug": tagged}
+
+    def answerQuestion(self, question):
+        facts = self.wikiFactoriser.getFacts()
+        if question in ["what", "who"]:
+            return facts.lead(2)
+        elif question == "when":
+            useful = facts.firstNumber()
+            if useful == "":
+                return "I am not sure about the date, but i have found an article"
+            return useful
+        elif question == "how many":
+            useful = facts.firstNumber()
+            if useful == "":
+                return "I am not sure about any numbers, but i have found an article"
+            return useful
+        else:
+            return facts.mentioning(question)
 
-class wikiFacts:
+    def lookup(self, plan):
+        search = plan["search"]
+        search2 = plan["fallback"]
+        if plan["question"] in ["what", "who"]:
+            #The lead is said sentence by sentence while the page downloads
+            found = self.sayStream(self.wikiFactoriser.streamFirst(plan["candidates"], 2))
+        else:
+            found = self.wikiFactoriser.loadFirst(plan["candidates"])
+            if found is not None:
+                self.say(self.answerQuestion(plan["question"]))
+        if found is None:
+            self.say("I don't know anything about "+search +" or "+search2)
+        else:
+            subject = plan["fallback"].strip()
+            if subject != "" and subject != self.continualSubject:
+                self.continualSubject = subject
+                self.prefetch.start(self.wikiFactoriser, lambda: self.followUpCandidates(subject))
+            self.offerMore()
+
+    def followUpCandidates(self, subject):
+        #The titles the usual follow up questions would look up, found by
+        #running those questions through the same parser. They aren't user
+        #traffic, so they are kept out of the metrics.
+        names = []
+        with metrics.quiet():
+            for followUp in self.followUps:
+                plan = self.planReply(self.parseCommand(followUp % subject))
+                if plan["action"] == "lookup":
+                    names.extend(plan["candidates"])
+        return names
+
+    def executeReply(self, plan):
+        if "choices" in plan:
+            self.say(plan["choices"][random.randrange(0, len(plan["choices"]))])
+        elif "text" in plan:
+            self.say(plan["text"])
+        if "debug" in plan:
+            self.say(str(plan["debug"]))
+        if plan["action"] == "browse":
+            self.openURL(plan["url"])
+        elif plan["action"] == "lookup":
+            self.lookup(plan)
+
+    def proscessCommand(self, s):
+        started = metrics.start()
+        self.executeReply(self.planReply(self.parseCommand(s)))
+        metrics.observe("command_seconds", started)
+
+class prefetcher:
+    #Warms the fact source's cache for likely follow up questions while the
+    #user is typing. Only the latest subject is worth warming, so starting
+    #a new one cancels whatever is left of the previous one.
+    def __init__(self, budget=6):
+        self.budget = budget
+        self.job = None
+
+    def start(self, source, names):
+        #names is called on the worker, so working out what to fetch costs
+        #the foreground nothing either
+        self.cancel()
+        cancelled = threading.Event()
+        self.job = (prefetchPool.submit(self.run, source, names, cancelled), cancelled)
+
+    def run(self, source, names, cancelled):
+        warmed = 0
+        for name in source.uniqueCandidates(names()):
+            if cancelled.is_set() or warmed >= self.budget:
+                break
+            try:
+                page = source.fetchPage(name)
+                if source.isUseful(page):
+                    source.factsFor(page)
+            except Exception:
+                pass
+            warmed += 1
+        return warmed
+
+    def cancel(self):
+        if self.job is not None:
+            self.job[0].cancel()
+            self.job[1].set()
+            self.job = None
+
+class factSource:
+    #Somewhere nlpTranslator can look things up. Subclasses provide
+    #fetchPage(name), returning a {"title", "summary", "exists"} entry,
+    #and urlFor(name); wikiFacts fetches live, localFacts (Knowledge.py)
+    #reads a prebuilt index.
     def __init__(self):
-        self.baseURL = """https://en.wikipedia.org/wiki/"""
-        self.spaceReplace = "_"
         self.page = None
         self.fullURL = ""
+    def fetchPage(self, name):
+        raise NotImplementedError
+    def urlFor(self, name):
+        return ""
     def loadPage(self, name):
-        nameSpacesReplaced = name.replace(" ", self.spaceReplace)
-        url = self.baseURL + nameSpacesReplaced
-        self.fullURL = url
-        pageRaw = requests.get(url)
-        self.page = bs4.BeautifulSoup(pageRaw.text, 'lxml')
+        self.fullURL = self.urlFor(name)
+        self.page = self.fetchPage(name)
+    def isUseful(self, page):
+        return page["exists"] and page["summary"].replace(" ", "").replace("\n", "") != ""
+    def uniqueCandidates(self, names):
+        candidates = []
+        for name in names:
+            if name.strip() != "" and normalizeTitle(name) not in [normalizeTitle(c) for c in candidates]:
+                candidates.append(name)
+        return candidates
+    def loadFirst(self, names):
+        for name in self.uniqueCandidates(names):
+            page = self.fetchPage(name)
+            if self.isUseful(page):
+                self.fullURL = self.urlFor(name)
+                self.page = page
+                return name
+        return None
+    def streamFirst(self, names, num):
+        #Generator giving the lead of the first useful page, in pieces as
+        #they become available; returns the name used, or None
+        name = self.loadFirst(names)
+        if name is not None:
+            yield self.getFacts().lead(num)
+        return name
     def checkExists(self):
-        styleCorrect = self.page.find_all("b")
-        for i in styleCorrect:
-            #print(i)
-            if "does not have an article" in str(i):
-                return False
-        return True
+        return self.page["exists"]
     def getTitle(self):
-        return self.page.find("title").getText()
+        return self.page["title"]
     def getSummary(self):
-        styleCorrect = self.page.find_all("p")
+        return self.page["summary"]
+    def getFacts(self):
+        return self.factsFor(self.page)
+    def factsFor(self, page):
+        #Kept on the cached entry, so it is shared by everyone asking about this page
+        facts = page.get("facts")
+        if facts is None:
+            facts = articleFacts(page["summary"])
+            page["facts"] = facts
+        return facts
+
+class wikiFacts(factSource):
+    def __init__(self, cache=None, timeout=5, useRest=False, http=None):
+        factSource.__init__(self)
+        self.baseURL = """https://en.wikipedia.org/wiki/"""
+        self.restURL = """https://en.wikipedia.org/api/rest_v1/page/summary/"""
+        self.useRest = useRest
+        self.spaceReplace = "_"
+        self.cache = cache if cache is not None else getPageCache()
+        self.timeout = timeout
+        self.http = http if http is not None else sharedHttp
+    def urlFor(self, name):
+        return self.baseURL + name.strip().replace(" ", self.spaceReplace)
+    def fetchPage(self, name):
+        page = self.cache.get(name)
+        if page is None:
+            page = self.fetchMissing(name)
+        return page
+    def fetchMissing(self, name):
+        #fetchPage for a name already known not to be cached
         try:
-            p = (styleCorrect[1]).getText()
-            if p.count(".") < 2 and len(styleCorrect) >= 3:
-                p = (styleCorrect[2]).getText()
-            if p.count(".") < 2 and len(styleCorrect) >= 4:
-                p = (styleCorrect[3]).getText()
-            if p.count(".") < 2 and len(styleCorrect) >= 5:
-                p = (styleCorrect[4]).getText()
-        except:
+            return self.http.shared(self.urlFor(name), lambda: self.cache.put(name, *self.download(name)))
+        except lazyImport("requests").RequestException:
+            #Network is down, an expired entry is better than nothing
+            page = self.cache.get(name, allowStale=True)
+            if page is None:
+                raise
+            return page
+    def startLookups(self, candidates):
+        #A future for each candidate, in order. Cached pages are answered
+        #here without going near the pool, and if one of them is useful
+        #before any candidate needs fetching, nothing is fetched at all.
+        futures = []
+        fetching = False
+        for name in candidates:
+            page = self.cache.get(name)
+            if page is None:
+                futures.append(lookupPool.submit(self.fetchMissing, name))
+                fetching = True
+                continue
+            future = Future()
+            future.set_result(page)
+            futures.append(future)
+            if not fetching and self.isUseful(page):
+                break
+        return futures
+    def firstUseful(self, candidates, futures, deadline):
+        #The first useful page in priority order that arrives by deadline
+        for (name, future) in zip(candidates, futures):
             try:
-                p = (styleCorrect[0]).getText()
-            except:
-                p = ""
-        return p
+                page = future.result(timeout=max(0, deadline - time.monotonic()))
+            except Exception:
+                continue
+            if self.isUseful(page):
+                return (name, page)
+        return (None, None)
+    def download(self, name):
+        if self.useRest:
+            started = metrics.start()
+            pageRaw = self.http.fetch(self.restURL + name.strip().replace(" ", self.spaceReplace), timeout=self.timeout)
+            self.recordFetch("rest", started, pageRaw.status_code, len(pageRaw.content))
+            if pageRaw.status_code == 404:
+                return ("", "", False)
+            if pageRaw.status_code == 200:
+                return extractRestSummary(pageRaw.json())
+        for (status, e) in self.extractStream(name):
+            pass
+        return (e.getTitle(), e.getSummary(), e.checkExists() and status == 200)
+    def extractStream(self, name):
+        #Only the top of the page is read, the connection is dropped once
+        #the extractor has what it needs. Yields (status, extractor) after
+        #every chunk. Only articles (200) and missing article pages (404)
+        #are worth reading, anything else is an error page that mustn't be
+        #cached or read out, so it raises and callers fall back to the cache.
+        started = metrics.start()
+        received = [0]
+        def counted(chunks):
+            for chunk in chunks:
+                received[0] += len(chunk)
+                yield chunk
+        with self.http.get(self.urlFor(name), timeout=self.timeout, stream=True) as pageRaw:
+            if pageRaw.status_code not in (200, 404):
+                self.recordFetch("html", started, pageRaw.status_code, 0)
+                raise lazyImport("requests").HTTPError("%d from %s" % (pageRaw.status_code, pageRaw.url), response=pageRaw)
+            for e in streamChunks(counted(pageRaw.iter_content(8192)), encoding=pageRaw.encoding or "utf-8"):
+                yield (pageRaw.status_code, e)
+        self.recordFetch("html", started, pageRaw.status_code, received[0])
+    def streamPage(self, name, num):
+        #fetchPage for a page that isn't cached yet, yielding the lead
+        #sentences as they arrive. The page is cached once it is all read.
+        if self.useRest:
+            page = self.fetchMissing(name)
+            if self.isUseful(page):
+                yield self.factsFor(page).lead(num)
+            return page
+        url = self.urlFor(name)
+        (future, owner) = self.http.claim(url)
+        if not owner:
+            #Someone is already fetching it, wait for theirs
+            page = self.fetchMissing(name)
+            if self.isUseful(page):
+                yield self.factsFor(page).lead(num)
+            return page
+        requests = lazyImport("requests")
+        lead = leadSentences(num)
+        page = None
+        error = None
+        try:
+            for (status, e) in self.extractStream(name):
+                if status != 200 or e.missing:
+                    continue
+                found = e.leadParagraph()
+                if found is not None:
+                    for sentence in lead.feed(*found):
+                        yield sentence
+            page = self.cache.put(name, e.getTitle(), e.getSummary(), e.checkExists() and status == 200)
+        except requests.RequestException as err:
+            error = err
+        finally:
+            if page is None and error is None:
+                #Given up on part way through, anyone waiting on it has to try again
+                error = requests.RequestException("fetch of %s was abandoned" % url)
+            self.http.finish(url, future, page, error)
+        if error is not None:
+            page = self.cache.get(name, allowStale=True)
+            if page is None:
+                raise error
+            if lead.emitted == 0 and self.isUseful(page):
+                yield self.factsFor(page).lead(num)
+        return page
+    def streamFirst(self, names, num):
+        #The first candidate is streamed while the others race in the
+        #background like loadFirst, in case it turns out to be no good
+        candidates = self.uniqueCandidates(names)
+        if not candidates:
+            return None
+        deadline = time.monotonic() + self.timeout
+        page = self.cache.get(candidates[0])
+        if page is not None and self.isUseful(page):
+            self.fullURL = self.urlFor(candidates[0])
+            self.page = page
+            yield self.factsFor(page).lead(num)
+            return candidates[0]
+        futures = self.startLookups(candidates[1:])
+        try:
+            if page is None:
+                try:
+                    page = yield from self.streamPage(candidates[0], num)
+                except Exception:
+                    page = None
+            if page is not None and self.isUseful(page):
+                self.fullURL = self.urlFor(candidates[0])
+                self.page = page
+                return candidates[0]
+            (name, page) = self.firstUseful(candidates[1:], futures, deadline)
+            if name is None:
+                return None
+            self.fullURL = self.urlFor(name)
+            self.page = page
+            yield self.factsFor(page).lead(num)
+            return name
+        finally:
+            for future in futures:
+                future.cancel()
+    def recordFetch(self, kind, started, status, size):
+        if not started:
+            return
+        metrics.observe("wiki_fetch_seconds", started, ("kind", kind))
+        metrics.histogram("wiki_fetch_bytes", size, ("kind", kind), byteBuckets)
+        metrics.count("wiki_fetch_total", ("kind", kind, "status", status))
+    def loadFirst(self, names):
+        #Fetches every candidate at once and keeps the first useful one in
+        #priority order, so a miss on the first title costs no extra round
+        #trip. The whole lookup gets one timeout, however many candidates.
+        candidates = self.uniqueCandidates(names)
+        deadline = time.monotonic() + self.timeout
+        futures = self.startLookups(candidates)
+        try:
+            (name, page) = self.firstUseful(candidates, futures, deadline)
+            if name is not None:
+                self.fullURL = self.urlFor(name)
+                self.page = page
+            return name
+        finally:
+            #Anything not yet started is dropped; requests already in flight
+            #still finish in the background and land in the cache
+            for future in futures:
+                future.cancel()
 
 class googleFacts:
     #Experimental and not fully working
@@ -486,8 +1102,8 @@ class googleFacts:
         nameSpacesReplaced = name.replace(" ", self.spaceReplace)
         url = self.baseURL + nameSpacesReplaced
         self.fullURL = url
-        pageRaw = requests.get(url)
-        self.page = bs4.BeautifulSoup(pageRaw.text, 'lxml')
+        pageRaw = sharedHttp.fetch(url)
+        self.page = lazyImport("bs4").BeautifulSoup(pageRaw.text, 'lxml')
     def checkExists(self):
         styleCorrect = self.page.find_all("span", {"class":"ILfuVd yZ8quc"})
         #for x in styleCorrect:
@@ -501,9 +1117,47 @@ class googleFacts:
     def getFact(keywords):
         pass
 
+parseManyTranslator = None
+
+def parseManyPart(utterances):
+    #Runs in a worker process of parseMany, each with its own translator
+    global parseManyTranslator
+    if parseManyTranslator is None:
+        parseManyTranslator = nlpTranslator(voice=False)
+    return parseManyTranslator.parseMany(utterances)
+
+
+def cacheReport(n):
+    lines = []
+    for (name, cache) in [("lemmas", lemmaCache), ("tags", tagCache)]:
+        lines.append("%-8s %6.1f%% of %d lookups" % (name, cache.hitRate() * 100, cache.stats["hits"] + cache.stats["misses"]))
+    if isinstance(n.wikiInstance, wikiFacts):
+        cache = n.wikiInstance.cache
+        lookups = sum(cache.stats[k] for k in ["memoryHits", "diskHits", "staleHits", "misses"])
+        lines.append("%-8s %6.1f%% of %d lookups" % ("pages", cache.hitRate() * 100, lookups))
+    return "\n".join(lines)
+
+def startupReport(n):
+    #Loads everything that is normally deferred so each part shows up
+    #separately, nested costs (e.g. import nltk inside tokenizer) are
+    #only counted where they happen first
+    lazyImport("nltk")
+    timeComponent("tokenizer (punkt)", lambda: tokenize("warm up"))
+    timeComponent("tagger (perceptron)", lambda: tag(["warm", "up"]))
+    timeComponent("wordnet corpus", lambda: n.normalizeVerb("running"))
+    lazyImport("requests")
+    sharedHttp.getSession()
+    n.wikiFactoriser
+    lazyImport("webbrowser")
+    lines = ["%-28s %9s" % ("component", "ms")]
+    for (name, seconds) in startupTimes.items():
+        lines.append("%-28s %9.1f" % (name, seconds * 1000))
+    return "\n".join(lines)
+
 if __name__=='__main__':
     n = nlpTranslator()
     #n.say("Initialising...")
     while True:
         inp = input("YOU>> ")
+        n.speech.interrupt()
         n.proscessCommand(inp)
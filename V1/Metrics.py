@@ -0,0 +1,145 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+latencyBuckets = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10)
+byteBuckets = (1024, 8192, 32768, 131072, 524288, 2097152)
+
+
+class metricsRegistry:
+    #Counters and histograms for the hot paths. Disabled by default, and
+    #while disabled every call returns straight away, so the instrumentation
+    #can be left in place everywhere:
+    #    started = metrics.start()
+    #    ...
+    #    metrics.observe("stage_seconds", started, ("stage", "tag"))
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.help = {}
+        self.snapshotThread = None
+        self.local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def suppressed(self):
+        return getattr(self.local, "quiet", False)
+
+    @contextlib.contextmanager
+    def quiet(self):
+        #Nothing is recorded on this thread inside the block, for work that
+        #isn't user traffic such as parsing prefetch guesses
+        previous = self.suppressed()
+        self.local.quiet = True
+        try:
+            yield
+        finally:
+            self.local.quiet = previous
+
+    def start(self):
+        return time.perf_counter() if self.enabled and not self.suppressed() else 0.0
+
+    def observe(self, name, started, labels=(), buckets=latencyBuckets):
+        if not started:
+            return
+        self.histogram(name, time.perf_counter() - started, labels, buckets)
+
+    def count(self, name, labels=(), value=1):
+        if not self.enabled or self.suppressed():
+            return
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def histogram(self, name, value, labels=(), buckets=latencyBuckets):
+        if not self.enabled or self.suppressed():
+            return
+        key = (name, labels)
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for (i, bound) in enumerate(buckets):
+                if value <= bound:
+                    h["counts"][i] += 1
+                    break
+            h["sum"] += value
+            h["count"] += 1
+
+    def gauge(self, name, read, description=""):
+        #read() is only called when a dump is taken, for values that are
+        #already counted somewhere else (cache stats and the like)
+        self.gauges[name] = read
+        if description:
+            self.help[name] = description
+
+    def describe(self, name, description):
+        self.help[name] = description
+
+    def labelText(self, labels, extra=()):
+        pairs = list(zip(labels[0::2], labels[1::2])) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for (k, v) in pairs) + "}"
+
+    def prometheus(self):
+        lines = []
+        seen = set()
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append("# HELP %s %s" % (name, self.help[name]))
+                lines.append("# TYPE %s %s" % (name, kind))
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((k, dict(v, counts=list(v["counts"]))) for (k, v) in self.histograms.items())
+        for ((name, labels), value) in counters:
+            header(name, "counter")
+            lines.append("%s%s %s" % (name, self.labelText(labels), value))
+        for ((name, labels), h) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for (bound, n) in zip(h["buckets"], h["counts"]):
+                cumulative += n
+                lines.append("%s_bucket%s %d" % (name, self.labelText(labels, [("le", bound)]), cumulative))
+            lines.append("%s_bucket%s %d" % (name, self.labelText(labels, [("le", "+Inf")]), h["count"]))
+            lines.append("%s_sum%s %s" % (name, self.labelText(labels), h["sum"]))
+            lines.append("%s_count%s %d" % (name, self.labelText(labels), h["count"]))
+        for (name, read) in sorted(self.gauges.items()):
+            header(name, "gauge")
+            lines.append("%s %s" % (name, read()))
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self.lock:
+            counters = [{"name": n, "labels": dict(zip(l[0::2], l[1::2])), "value": v} for ((n, l), v) in self.counters.items()]
+            histograms = [{"name": n, "labels": dict(zip(l[0::2], l[1::2])), "buckets": list(h["buckets"]), "counts": list(h["counts"]),
+                           "sum": h["sum"], "count": h["count"]} for ((n, l), h) in self.histograms.items()]
+        gauges = dict((name, read()) for (name, read) in self.gauges.items())
+        return {"time": time.time(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def writeSnapshots(self, path, interval=30):
+        #Rewrites path with a JSON snapshot every interval seconds
+        def run():
+            while True:
+                time.sleep(interval)
+                with open(path + ".tmp", "w") as f:
+                    json.dump(self.snapshot(), f)
+                os.replace(path + ".tmp", path)
+        self.snapshotThread = threading.Thread(target=run, daemon=True)
+        self.snapshotThread.start()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+metrics = metricsRegistry()
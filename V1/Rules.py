@@ -0,0 +1,89 @@
+import bisect
+
+
+compiledConditions = {}
+
+
+def compileCondition(condition):
+    #"verb:be,subject:i,adjective:hungry" -> (keys that must be there,
+    #(key, value) pairs that must match). Parsed once per distinct string.
+    found = compiledConditions.get(condition)
+    if found is None:
+        keys = []
+        pairs = []
+        for o in condition.split(","):
+            if o == "":
+                continue
+            if ":" in o:
+                kvp = o.split(":")
+                keys.append(kvp[0])
+                pairs.append((kvp[0], kvp[1]))
+            else:
+                keys.append(o)
+        found = compiledConditions.setdefault(condition, (frozenset(keys), tuple(pairs)))
+    return found
+
+
+def testCondition(slots, compiled):
+    (keys, pairs) = compiled
+    for k in keys:
+        if k not in slots:
+            return False
+    for (k, v) in pairs:
+        if slots[k] != v:
+            return False
+    return True
+
+
+class ruleEngine:
+    #Intents registered as data: a condition and a handler returning a plan.
+    #Rules are grouped by shape, the keys they need and which of those must
+    #have a given value, and within a shape filed by those values, so each
+    #shape costs one dictionary probe however many rules there are. There
+    #are only ever a handful of shapes. Higher priority wins, then the rule
+    #with more key:value pairs, then the one registered first; the fallback
+    #handler is used when none match.
+    def __init__(self):
+        self.rules = []
+        #(keys, keys with values) -> {values: rules, best first}
+        self.shapes = {}
+        self.fallback = None
+
+    def add(self, condition, handler, priority=0):
+        (keys, pairs) = compileCondition(condition)
+        rule = ((-priority, -len(pairs), len(self.rules)), keys, pairs, handler, condition)
+        self.rules.append(rule)
+        pairs = sorted(pairs)
+        shape = (keys, tuple(k for (k, v) in pairs))
+        bucket = self.shapes.setdefault(shape, {}).setdefault(tuple(v for (k, v) in pairs), [])
+        #The first part of a rule is unique, so rules sort on it alone
+        bisect.insort(bucket, rule)
+        return handler
+
+    def rule(self, condition, priority=0):
+        #Decorator form of add
+        return lambda handler: self.add(condition, handler, priority)
+
+    def otherwise(self, handler):
+        #Decorator for the handler used when no rule matches
+        self.fallback = handler
+        return handler
+
+    def match(self, slots):
+        best = None
+        for ((keys, valued), byValues) in self.shapes.items():
+            if not keys.issubset(slots.keys()):
+                continue
+            bucket = byValues.get(tuple(slots[k] for k in valued))
+            if bucket and (best is None or bucket[0][0] < best[0]):
+                best = bucket[0]
+        return best
+
+    def dispatch(self, slots, *args):
+        #The plan from the first matching rule's handler, or the fallback's
+        rule = self.match(slots)
+        if rule is not None:
+            return rule[3](slots, *args)
+        if self.fallback is not None:
+            return self.fallback(slots, *args)
+        return None
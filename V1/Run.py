@@ -1,8 +1,52 @@
+import time
+startTime = time.perf_counter()
+import argparse
 from Libraries import *
+from Speech import nullSpeech, fileSpeech
+from Metrics import metrics
 
 if __name__=='__main__':
-    n = nlpTranslator()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--startup-report", action="store_true", help="print how long each component takes to load and exit")
+    parser.add_argument("--cache-report", action="store_true", help="print lemma, tag and page cache hit rates on exit")
+    parser.add_argument("--knowledge", help="answer from a local index built with Knowledge.py instead of live Wikipedia")
+    parser.add_argument("--metrics", help="record timings and counters, writing a JSON snapshot to this file")
+    parser.add_argument("--metrics-interval", type=float, default=30, help="seconds between metrics snapshots")
+    parser.add_argument("--speech", default="auto", help="auto (SAPI when available), none, or a file to write speech to")
+    args = parser.parse_args()
+    if args.speech == "auto":
+        backend = None
+    elif args.speech == "none":
+        backend = nullSpeech()
+    else:
+        backend = fileSpeech(args.speech)
+    if args.metrics:
+        metrics.enable()
+        metrics.writeSnapshots(args.metrics, args.metrics_interval)
+    facts = None
+    if args.knowledge:
+        from Knowledge import localIndex, localFacts
+        index = localIndex(args.knowledge)
+        facts = lambda: localFacts(index)
+    n = nlpTranslator(speech=backend, facts=facts)
+    if args.startup_report:
+        print("%-28s %9.1f" % ("ready for input", (time.perf_counter() - startTime) * 1000))
+        print(startupReport(n))
+        sys.exit()
     #n.say("Initialising...")
-    while True:
-        inp = input("YOU>> ")
-        n.proscessCommand(inp)
+    try:
+        while True:
+            inp = input("YOU>> ")
+            #Stop talking as soon as the user has something new to say
+            n.speech.interrupt()
+            n.proscessCommand(inp)
+    except KeyboardInterrupt:
+        print()
+        n.speech.interrupt()
+    except EOFError:
+        print()
+    finally:
+        #Finishes the last reply (all of them, for a file) and closes the backend
+        n.speech.close()
+        if args.cache_report:
+            print(cacheReport(n))
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from Libraries import *
+from Metrics import metrics
+
+
+class sessionTranslator(nlpTranslator):
+    #One per connection, so each user has their own subject and current page.
+    #Tagging, lemmas, templates and the page cache are shared by the process.
+    def __init__(self, send, facts=None):
+        nlpTranslator.__init__(self, voice=False, facts=facts)
+        self.send = send
+        #(url, title) of the page the user was just asked about, if they
+        #haven't answered yet
+        self.pending = None
+
+    def say(self, s):
+        try:
+            s = s.encode("ascii", errors="ignore").decode()
+        except:
+            pass
+        self.send("COM>> %s" % s)
+
+    def offerMore(self):
+        #A worker isn't kept waiting while the user thinks it over: ask, and
+        #the next line they send is the answer
+        self.say("Do you want to learn more?")
+        self.pending = (self.wikiFactoriser.fullURL, self.wikiFactoriser.getTitle())
+
+    def proscessCommand(self, s):
+        if self.pending is not None:
+            (url, title) = self.pending
+            self.pending = None
+            answer = s.strip().lower()
+            if self.isYes(answer):
+                self.openPage(url, title)
+                return
+            if answer in ["no", "nah", "nope", "n"]:
+                return
+            #Anything else is taken as a new command rather than swallowed
+        nlpTranslator.proscessCommand(self, s)
+
+    def openURL(self, url):
+        #There is no browser on the user's side of the socket, give them the link
+        self.send("COM>> %s" % url)
+
+
+class chatServer:
+    def __init__(self, workers=32, facts=None):
+        self.facts = facts
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        sizeLookupPool(workers)
+        self.sessions = 0
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue()
+        self.sessions += 1
+
+        def send(line):
+            #Called from worker threads
+            loop.call_soon_threadsafe(writer.write, (line + "\n").encode("utf-8"))
+
+        session = sessionTranslator(send, self.facts)
+
+        async def readLines():
+            while True:
+                data = await reader.readline()
+                if not data:
+                    break
+                await inbox.put(data.decode("utf-8", errors="ignore").strip())
+            await inbox.put(None)
+
+        readerTask = asyncio.create_task(readLines())
+        try:
+            while True:
+                line = await inbox.get()
+                if line is None:
+                    break
+                try:
+                    await loop.run_in_executor(self.pool, session.proscessCommand, line)
+                except Exception as e:
+                    send("COM>> Something went wrong: %s" % e)
+                await writer.drain()
+        finally:
+            readerTask.cancel()
+            self.sessions -= 1
+            writer.close()
+
+    async def serveMetrics(self, reader, writer):
+        #Just enough HTTP for a Prometheus scrape: any request gets the dump
+        try:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = metrics.prometheus().encode("utf-8")
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\nContent-Length: %d\r\n\r\n" % len(body))
+            writer.write(body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, metricsPort=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        print("Listening on %s" % ", ".join(str(s.getsockname()) for s in server.sockets))
+        if metricsPort is not None:
+            await asyncio.start_server(self.serveMetrics, host, metricsPort)
+            print("Metrics on http://%s:%d/metrics" % (host, metricsPort))
+        async with server:
+            await server.serve_forever()
+
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Serve the chatbot to many users over a line based TCP protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--workers", type=int, default=32, help="threads for parsing and lookups")
+    parser.add_argument("--knowledge", help="answer from a local index built with Knowledge.py instead of live Wikipedia")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics over HTTP on this port")
+    args = parser.parse_args()
+    if args.metrics_port is not None:
+        metrics.enable()
+    facts = None
+    if args.knowledge:
+        from Knowledge import localIndex, localFacts
+        index = localIndex(args.knowledge)
+        facts = lambda: localFacts(index)
+    try:
+        asyncio.run(chatServer(args.workers, facts=facts).serve(args.host, args.port, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,133 @@
+import importlib.util
+import queue
+import threading
+from Metrics import metrics
+
+
+class nullSpeech:
+    #Says nothing, for machines without a speech engine
+    interruptible = True
+    def start(self):
+        pass
+    def speak(self, text, cancelled):
+        pass
+    def stop(self):
+        pass
+
+
+class fileSpeech:
+    #Writes what would have been said to a file, one line per utterance.
+    #It is a record of every reply, so new input doesn't cut it short.
+    interruptible = False
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+    def start(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+    def speak(self, text, cancelled):
+        self.file.write(text + "\n")
+        self.file.flush()
+    def stop(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class sapiSpeech:
+    #Windows SAPI voice. COM objects belong to the thread that made them,
+    #so everything here runs on the queue's worker thread.
+    SVSFlagsAsync = 1
+    SVSFPurgeBeforeSpeak = 2
+    interruptible = True
+    def __init__(self):
+        self.voice = None
+    def start(self):
+        import pythoncom
+        from win32com.client import Dispatch
+        pythoncom.CoInitialize()
+        self.voice = Dispatch("SAPI.SpVoice")
+    def speak(self, text, cancelled):
+        self.voice.Speak(text, self.SVSFlagsAsync)
+        while not self.voice.WaitUntilDone(100):
+            if cancelled.is_set():
+                self.voice.Speak("", self.SVSFlagsAsync | self.SVSFPurgeBeforeSpeak)
+                break
+    def stop(self):
+        self.voice = None
+
+
+def defaultSpeech():
+    #Only check pywin32 is there, importing it is slow and happens on the worker
+    if importlib.util.find_spec("win32com") is None:
+        return nullSpeech()
+    return sapiSpeech()
+
+
+class speechQueue:
+    #Speaks on a background thread so the bot can carry on while talking.
+    #cancel() drops anything queued and cuts off the current utterance;
+    #close() says whatever is still queued and shuts the backend down.
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else defaultSpeech()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def enqueue(self, text):
+        with self.lock:
+            #The worker only starts once there is something to say
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.queue.put((self.generation, text))
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.cancelled.set()
+            try:
+                while True:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+            except queue.Empty:
+                pass
+
+    def interrupt(self):
+        #The user has something new to say, so stop talking if the backend
+        #is one that can be talked over
+        if self.backend.interruptible:
+            self.cancel()
+
+    def wait(self):
+        self.queue.join()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put((None, None))
+            self.thread.join()
+
+    def run(self):
+        try:
+            self.backend.start()
+        except Exception as e:
+            print("Speech unavailable (%s), continuing without it" % e)
+            self.backend = nullSpeech()
+        while True:
+            (generation, text) = self.queue.get()
+            try:
+                if text is None:
+                    break
+                with self.lock:
+                    if generation != self.generation:
+                        continue
+                    self.cancelled.clear()
+                started = metrics.start()
+                self.backend.speak(text, self.cancelled)
+                metrics.observe("say_seconds", started, ("backend", type(self.backend).__name__))
+            except Exception as e:
+                print("Speech failed: %s" % e)
+            finally:
+                self.queue.task_done()
+        self.backend.stop()